@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Admin contact request list serialization throughput (rows/sec).
+
+Compares the old read path with the current one on page sizes of 100, 1k
+and 10k documents:
+
+- legacy: whole documents, ``ContactRequest(**doc)`` per row, then FastAPI's
+  response_model validation and serialization, then orjson rendering
+- current: documents with ``ADMIN_LIST_PROJECTION`` serialized by the
+  precompiled ``CONTACT_REQUEST_LIST`` TypeAdapter in a single pass
+
+MongoDB is not involved; only the per-row work done by the server is timed.
+
+Usage: python backend/benchmarks/bench_admin_read.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+import orjson  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import server  # noqa: E402
+from lead_queries import ADMIN_LIST_FIELDS  # noqa: E402
+
+SIZES = (100, 1000, 10000)
+
+LEGACY_RESPONSE = TypeAdapter(List[server.ContactRequest])
+
+
+def stored_documents(rows: int):
+    form = server.ContactRequestCreate(
+        name="Иван Петров",
+        phone="+7 (918) 633-32-21",
+        email="ivan.petrov@example.com",
+        buildingType="Складское здание",
+        area="1500 м²",
+        message="Нужен склад для логистической компании, срок строительства до конца сезона",
+    )
+    documents = []
+    for i in range(rows):
+        doc = server.build_contact_request(form, dedupe_window_seconds=600).model_dump()
+        doc["_id"] = f"{i:024x}"
+        documents.append(doc)
+    return documents
+
+
+def legacy(documents):
+    models = [server.ContactRequest(**doc) for doc in documents]
+    # FastAPI 0.110: validate against response_model, dump in JSON mode, render
+    validated = LEGACY_RESPONSE.validate_python(models)
+    return orjson.dumps(LEGACY_RESPONSE.dump_python(validated, mode="json"))
+
+
+def current(documents):
+    return server.CONTACT_REQUEST_LIST.dump_json(documents)
+
+
+def best_time(func, documents, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(documents)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'legacy rows/s':>14} {'current rows/s':>15} {'speedup':>8} {'legacy KB':>10} {'current KB':>11}")
+    for rows in SIZES:
+        documents = stored_documents(rows)
+        # What the projection leaves of each document
+        projected = [{field: doc[field] for field in ADMIN_LIST_FIELDS if field in doc} for doc in documents]
+        legacy_s = best_time(legacy, documents, args.repeat)
+        current_s = best_time(current, projected, args.repeat)
+        print(
+            f"{rows:>6} {rows / legacy_s:>14,.0f} {rows / current_s:>15,.0f} {legacy_s / current_s:>7.1f}x"
+            f" {len(legacy(documents)) / 1024:>10.1f} {len(current(projected)) / 1024:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
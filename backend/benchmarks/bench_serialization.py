@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Per-route response serialization time and payload size.
+
+Compares FastAPI's default JSONResponse with ORJSONResponse on the payloads
+each route returns, and reports body size uncompressed, gzip and brotli.
+
+Usage: python backend/benchmarks/bench_serialization.py [--number N]
+"""
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+
+import server  # noqa: E402
+from compression import SUPPORTED_ENCODINGS, compress  # noqa: E402
+
+
+def admin_page(rows: int):
+    form = server.ContactRequestCreate(
+        name="Иван Петров",
+        phone="+7 (918) 633-32-21",
+        email="ivan.petrov@example.com",
+        buildingType="Складское здание",
+        area="1500 м²",
+        message="Нужен склад для логистической компании, срок строительства до конца сезона",
+    )
+    return [server.build_contact_request(form) for _ in range(rows)]
+
+
+def payloads():
+    return {
+        "/api/company-info": server.CompanyInfo(),
+        "/api/services": [server.Service(**item) for item in server.SERVICES_DATA],
+        "/api/projects": [server.Project(**item) for item in server.PROJECTS_DATA],
+        "/api/admin/contact-requests (100 rows)": admin_page(100),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    header = f"{'route':<40} {'json µs':>9} {'orjson µs':>10} {'bytes':>7}"
+    for encoding in SUPPORTED_ENCODINGS:
+        header += f" {encoding + ' bytes':>11}"
+    print(header)
+    for route, data in payloads().items():
+        # FastAPI runs jsonable_encoder before render() for response_model routes
+        encoded = jsonable_encoder(data)
+        timings = {}
+        for name, response_class in (("json", JSONResponse), ("orjson", ORJSONResponse)):
+            seconds = min(timeit.repeat(lambda: response_class(encoded), number=args.number, repeat=3))
+            timings[name] = seconds / args.number * 1e6
+        body = ORJSONResponse(encoded).body
+        line = f"{route:<40} {timings['json']:>9.1f} {timings['orjson']:>10.1f} {len(body):>7}"
+        for encoding in SUPPORTED_ENCODINGS:
+            line += f" {len(compress(body, encoding)):>11}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Cold start time: module import, app creation, lifespan startup, first request.
+
+Each run is a fresh interpreter, so import costs are measured cold. Unless
+--mongo-url is given, MongoDB is replaced with mongomock-motor.
+
+Usage: python backend/benchmarks/bench_startup.py [--runs N] [--mongo-url URL]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in the child interpreter; prints one JSON object with phase durations in ms
+CHILD = r'''
+import time
+started = time.perf_counter()
+import asyncio, json, logging, os, sys
+sys.path.insert(0, {backend!r})
+mongo_url = {mongo_url!r}
+if mongo_url:
+    os.environ["MONGO_URL"] = mongo_url
+else:
+    import mongomock_motor
+    import motor.motor_asyncio
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+os.environ.setdefault("DB_NAME", "benchmark")
+os.environ.setdefault("RATE_LIMITS", "")
+import httpx
+marks = {{"setup": time.perf_counter()}}
+import server
+marks["import"] = time.perf_counter()
+logging.disable(logging.CRITICAL)
+app = server.create_app()
+marks["create_app"] = time.perf_counter()
+
+async def run():
+    async with app.router.lifespan_context(app):
+        marks["startup"] = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            response = await client.get("/api/services")
+            assert response.status_code == 200, response.status_code
+        marks["first_request"] = time.perf_counter()
+
+asyncio.run(run())
+previous, phases = marks["setup"], {{}}
+for name in ("import", "create_app", "startup", "first_request"):
+    phases[name] = (marks[name] - previous) * 1000
+    previous = marks[name]
+phases["import_to_first_request"] = (marks["first_request"] - marks["setup"]) * 1000
+print(json.dumps(phases))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mongo-url", default=None, help="use a real MongoDB instead of mongomock")
+    args = parser.parse_args()
+
+    code = CHILD.format(backend=str(BACKEND_DIR), mongo_url=args.mongo_url)
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'phase':<24} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for phase in runs[0]:
+        values = [run[phase] for run in runs]
+        print(f"{phase:<24} {statistics.median(values):>10.1f} {min(values):>8.1f} {max(values):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Microbenchmark: contact form phone/email validation, legacy vs. validation.py.
+
+Usage: python backend/benchmarks/bench_validation.py [--number N]
+"""
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from validation import canonical_phone, is_valid_email, normalize_email  # noqa: E402
+
+
+PHONES = [
+    "+7 (918) 633-32-21",
+    "+79186333221",
+    "89186333221",
+    "8 918 633 32 21",
+    "+7-918-633-32-21",
+    "invalid-phone",
+]
+EMAILS = ["valid@example.com", "user.name@domain.co.uk", "test+tag@gmail.com", "invalid-email", "user@"]
+
+
+def legacy_phone(v):
+    phone_pattern = r'^(\+7|8)?[\s\-]?\(?\d{3}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}$'
+    return bool(re.match(phone_pattern, v.replace(' ', '').replace('-', '').replace('(', '').replace(')', '')))
+
+
+def legacy_email(v):
+    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return bool(re.match(email_pattern, v))
+
+
+def legacy():
+    for phone in PHONES:
+        legacy_phone(phone)
+    for email in EMAILS:
+        legacy_email(email)
+
+
+def legacy_canonicalize():
+    # Legacy validation followed by a separate pass to build the canonical fields
+    for phone in PHONES:
+        if legacy_phone(phone):
+            digits = phone.replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
+            "+7" + digits[-10:]
+    for email in EMAILS:
+        if legacy_email(email):
+            email.strip().lower()
+
+
+def current():
+    # Validation and canonicalization, as done on every form submit
+    for phone in PHONES:
+        canonical_phone(phone)
+    for email in EMAILS:
+        if is_valid_email(email):
+            normalize_email(email)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    per_call = len(PHONES) + len(EMAILS)
+    results = {}
+    for name, fn in (
+        ("legacy (validate only)", legacy),
+        ("legacy (validate + canonicalize)", legacy_canonicalize),
+        ("current (validate + canonicalize)", current),
+    ):
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=3))
+        results[name] = args.number * per_call / seconds
+        print(f"{name:>34}: {results[name]:,.0f} validations/sec")
+    speedup = results["current (validate + canonicalize)"] / results["legacy (validate + canonicalize)"]
+    print(f"{'speedup':>34}: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""In-process load benchmark for the /api routes.
+
+Drives an app from ``server.create_app()`` through httpx's ASGI transport, so
+no network or deployed preview is needed. Unless --mongo-url is given, MongoDB is replaced
+with an in-memory mongomock-motor client before the server module is imported.
+
+Routes that change or consume data (status updates, deletes, archive reads)
+get their documents from ``Fixtures``, prepared before the run. The SSE
+stream is left out because its response never completes, and search because
+mongomock does not implement ``$text``.
+
+Usage:
+    python backend/benchmarks/load.py --requests 500 --concurrency 20 > baseline.json
+    python backend/benchmarks/load.py --routes "GET /api/services" "POST /api/contact-form"
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+
+CONTACT_FORM = {
+    "name": "Иван Петров",
+    "phone": "+7 (918) 633-32-21",
+    "email": "ivan.petrov@example.com",
+    "buildingType": "Складское здание",
+    "area": "1500 м²",
+    "message": "Нужен склад для логистической компании",
+}
+IMPORT_BODY = "\n".join(json.dumps(CONTACT_FORM, ensure_ascii=False) for _ in range(10)).encode()
+SERVICE = {"category": "Промышленные объекты", "items": ["Складские здания", "Производственные цеха"]}
+PROJECT = {
+    "title": "Складской комплекс 2400 м²",
+    "description": "Арочный ангар с утеплением",
+    "area": "2400 м²",
+    "duration": "45 дней",
+    "type": "Складское здание",
+}
+BULK_STATUS_SIZE = 10
+ARCHIVED_LEADS = 200
+
+
+class Fixtures:
+    """Documents consumed by routes that change data, one per request."""
+
+    def __init__(self):
+        self.lead_ids: List[str] = []
+        self.service_ids: List[int] = []
+        self.project_ids: List[int] = []
+        self.archived_id = ""
+
+    async def prepare(self, server, context, routes: List[str], per_route: int):
+        leads = per_route * (("PATCH /api/admin/contact-requests/{request_id}" in routes)
+                             + BULK_STATUS_SIZE * ("PATCH /api/admin/contact-requests" in routes))
+        lead = server.build_contact_request(server.ContactRequestCreate(**CONTACT_FORM)).model_dump()
+        if leads:
+            # Distinct dedupe keys: mongomock ignores the unique index's partialFilterExpression
+            docs = [{**lead, "id": lead_id, "dedupe_key": lead_id} for lead_id in (str(uuid.uuid4()) for _ in range(leads))]
+            await context.db.contact_requests.insert_many(docs)
+            self.lead_ids = [doc["id"] for doc in docs]
+        if any(route.startswith("GET /api/admin/archive/") for route in routes):
+            from lead_archive import trim_lead
+
+            created_at = datetime.utcnow() - timedelta(days=400)
+            docs = [
+                trim_lead({**lead, "id": str(uuid.uuid4()), "created_at": created_at - timedelta(minutes=i)}, created_at)
+                for i in range(ARCHIVED_LEADS)
+            ]
+            await context.db.contact_requests_archive.insert_many(docs)
+            self.archived_id = docs[0]["id"]
+        if "DELETE /api/admin/services/{service_id}" in routes:
+            for _ in range(per_route):
+                self.service_ids.append((await context.content_store.create("services", dict(SERVICE)))["id"])
+        if "DELETE /api/admin/projects/{project_id}" in routes:
+            for _ in range(per_route):
+                self.project_ids.append((await context.content_store.create("projects", dict(PROJECT)))["id"])
+
+
+# "METHOD path" -> request keyword arguments for httpx; "path" fills in path parameters
+ROUTES: Dict[str, Callable[[Fixtures], Dict[str, Any]]] = {
+    "GET /api/": lambda f: {},
+    "GET /api/ready": lambda f: {},
+    "GET /api/metrics": lambda f: {},
+    "GET /api/company-info": lambda f: {},
+    "GET /api/services": lambda f: {},
+    "GET /api/projects": lambda f: {},
+    "GET /api/estimate": lambda f: {
+        "params": {
+            "building_type": "Складские здания",
+            "area": random.randint(10, 5000),
+            "frame": random.choice(("arched", "straight")),
+            "insulation": random.choice(("cold", "insulated")),
+        }
+    },
+    "POST /api/contact-form": lambda f: {"json": CONTACT_FORM},
+    "GET /api/admin/contact-requests": lambda f: {"params": {"limit": 100}},
+    "PATCH /api/admin/contact-requests/{request_id}": lambda f: {
+        "path": f"/api/admin/contact-requests/{f.lead_ids.pop()}",
+        "json": {"status": "in_progress"},
+    },
+    "PATCH /api/admin/contact-requests": lambda f: {
+        "json": {"updates": [{"id": f.lead_ids.pop(), "status": "in_progress"} for _ in range(BULK_STATUS_SIZE)]}
+    },
+    "GET /api/admin/contact-requests/export": lambda f: {"params": {"format": "ndjson"}},
+    "POST /api/admin/contact-requests/import": lambda f: {
+        "content": IMPORT_BODY,
+        "headers": {"Content-Type": "application/x-ndjson"},
+    },
+    "GET /api/admin/archive/contact-requests": lambda f: {"params": {"limit": 100}},
+    "GET /api/admin/archive/contact-requests/{request_id}": lambda f: {
+        "path": f"/api/admin/archive/contact-requests/{f.archived_id}"
+    },
+    "GET /api/admin/stats": lambda f: {},
+    "POST /api/admin/stats/rebuild": lambda f: {},
+    "POST /api/admin/services": lambda f: {"json": SERVICE},
+    "PUT /api/admin/services/{service_id}": lambda f: {"path": "/api/admin/services/1", "json": SERVICE},
+    "DELETE /api/admin/services/{service_id}": lambda f: {"path": f"/api/admin/services/{f.service_ids.pop()}"},
+    "POST /api/admin/projects": lambda f: {"json": PROJECT},
+    "PUT /api/admin/projects/{project_id}": lambda f: {"path": "/api/admin/projects/1", "json": PROJECT},
+    "DELETE /api/admin/projects/{project_id}": lambda f: {"path": f"/api/admin/projects/{f.project_ids.pop()}"},
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_route(
+    client: httpx.AsyncClient, route: str, total: int, concurrency: int, fixtures: Fixtures
+) -> Dict[str, Any]:
+    method, path = route.split(" ", 1)
+    make_kwargs = ROUTES[route]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            kwargs = make_kwargs(fixtures)
+            url = kwargs.pop("path", path)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "min": round(latencies[0], 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "status_codes": statuses,
+    }
+
+
+def load_app(mongo_url: Optional[str]):
+    if mongo_url:
+        os.environ["MONGO_URL"] = mongo_url
+    else:
+        import mongomock_motor
+        import motor.motor_asyncio
+
+        os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    os.environ.setdefault("DB_NAME", "benchmark")
+    # The .env rate limits would turn most benchmark traffic into 429s
+    os.environ.setdefault("RATE_LIMITS", "")
+
+    import server
+
+    # httpx logs every request at INFO, which would dominate the run
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return server
+
+
+async def main_async(args) -> Dict[str, Any]:
+    server = load_app(args.mongo_url)
+    app = server.create_app()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for _ in range(args.seed):
+                await client.post("/api/contact-form", json=CONTACT_FORM)
+            warmup = min(args.warmup, args.requests)
+            fixtures = Fixtures()
+            await fixtures.prepare(server, app.state.context, args.routes, args.requests + warmup)
+            results = {}
+            for route in args.routes:
+                # Warm-up pass so one-time costs do not skew the percentiles
+                await run_route(client, route, warmup, args.concurrency, fixtures)
+                results[route] = await run_route(client, route, args.requests, args.concurrency, fixtures)
+    return {
+        "config": {
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+            "seeded_leads": args.seed,
+            "mongo": args.mongo_url or "mongomock-motor (in-memory)",
+            "python": platform.python_version(),
+        },
+        "routes": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=20, help="warm-up requests per route")
+    parser.add_argument("--seed", type=int, default=100, help="leads inserted before the run")
+    parser.add_argument("--routes", nargs="+", default=list(ROUTES), choices=list(ROUTES), metavar="ROUTE")
+    parser.add_argument("--mongo-url", default=None, help="use a real MongoDB instead of mongomock")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
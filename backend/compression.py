@@ -0,0 +1,165 @@
+"""Accept-Encoding negotiated gzip/brotli response compression.
+
+Brotli is used only when the optional ``brotli`` package is installed;
+otherwise negotiation falls back to gzip. Responses that already carry a
+Content-Encoding (e.g. precompressed content cache payloads) pass through.
+"""
+import gzip
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/x-ndjson",
+    b"text/",
+)
+# Event streams must reach the client unbuffered
+UNCOMPRESSED_TYPES = (b"text/event-stream",)
+
+GZIP_LEVEL = 6
+# Quality 5 keeps brotli at gzip-like CPU cost while still compressing better
+BROTLI_QUALITY = 5
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = qualities.get(coding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._process = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            # wbits 16+MAX_WBITS writes a gzip header and trailer
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._process = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush per chunk so streamed responses reach the client incrementally
+        return self._process(data) + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses of at least ``minimum_size`` bytes."""
+
+    def __init__(self, app, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = _header(scope["headers"], b"accept-encoding")
+        encoding = negotiate_encoding(accept_encoding.decode("latin-1") if accept_encoding else None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = message.get("headers", [])
+                content_type = _header(headers, b"content-type") or b""
+                if (
+                    _header(headers, b"content-encoding") is not None
+                    or message["status"] < 200
+                    or message["status"] in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(UNCOMPRESSED_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                headers = [
+                    (key, value) for key, value in start_message.get("headers", [])
+                    if key.lower() not in (b"content-length", b"etag")
+                ]
+                etag = _header(start_message.get("headers", []), b"etag")
+                if etag is not None:
+                    # The compressed body is a different representation
+                    headers.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+                headers.append((b"content-encoding", encoding.encode()))
+                headers.append((b"vary", b"Accept-Encoding"))
+                compressor = _StreamCompressor(encoding)
+                if not more_body:
+                    data = compress(body, encoding)
+                    headers.append((b"content-length", str(len(data)).encode()))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send({**start_message, "headers": headers})
+            data = compressor.chunk(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,86 @@
+"""Pre-serialized response cache for static landing-page content.
+
+Payloads are serialized to JSON once per content version and served as raw
+bytes with a strong ETag, so a cache hit costs a dict lookup and a header
+comparison instead of model validation and JSON encoding. Payloads above the
+compression threshold are also precompressed for every supported encoding.
+"""
+import hashlib
+from typing import Callable, Dict, Optional
+
+from fastapi import Request, Response
+
+from compression import SUPPORTED_ENCODINGS, compress, negotiate_encoding
+
+
+class CachedPayload:
+    __slots__ = ("body", "etag", "encoded")
+
+    def __init__(self, body: bytes, version: str, min_compress_size: int):
+        self.body = body
+        digest = hashlib.sha256(version.encode() + b"\0" + body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # encoding -> (compressed body, ETag of that representation)
+        self.encoded = {}
+        if len(body) >= min_compress_size:
+            for encoding in SUPPORTED_ENCODINGS:
+                self.encoded[encoding] = (compress(body, encoding), f'"{digest}-{encoding}"')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class ContentCache:
+    """Holds serialized payloads for a single content version.
+
+    ``ensure(version, builder)`` rebuilds every payload when the version
+    changes; the new mapping is swapped in with a single assignment so
+    concurrent readers always see a complete snapshot.
+    """
+
+    def __init__(self, max_age: int = 300, media_type: str = "application/json", min_compress_size: int = 500):
+        self.max_age = max_age
+        self.media_type = media_type
+        self.min_compress_size = min_compress_size
+        self.version: Optional[str] = None
+        self._payloads: Dict[str, CachedPayload] = {}
+
+    def ensure(self, version: str, builder: Callable[[], Dict[str, bytes]]) -> None:
+        if version == self.version:
+            return
+        payloads = {
+            key: CachedPayload(body, version, self.min_compress_size) for key, body in builder().items()
+        }
+        self._payloads, self.version = payloads, version
+
+    def get(self, key: str) -> CachedPayload:
+        return self._payloads[key]
+
+    def response(self, key: str, request: Request) -> Response:
+        payload = self._payloads[key]
+        body, etag = payload.body, payload.etag
+        headers = {"Cache-Control": f"public, max-age={self.max_age}"}
+        if payload.encoded:
+            headers["Vary"] = "Accept-Encoding"
+            encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+            if encoding in payload.encoded:
+                body, etag = payload.encoded[encoding]
+                headers["Content-Encoding"] = encoding
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=self.media_type, headers=headers)
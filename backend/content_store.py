@@ -0,0 +1,157 @@
+"""Mongo-backed services and projects catalogs served from an in-memory snapshot.
+
+Catalog documents live in the ``services`` and ``projects`` collections; the
+``content_meta`` document holds a version number that every admin write bumps.
+Public reads never touch Mongo: they are answered from the pre-serialized
+``ContentCache`` snapshot. ``refresh`` reloads the catalogs when the stored
+version differs from the cached one and swaps the new snapshot in atomically,
+so readers keep getting the previous payloads until the rebuild is done. A
+background poller calls ``refresh`` periodically so edits made through
+another worker are picked up too. A database without the meta document was
+never seeded (Mongo was down at startup): ``refresh`` and admin writes seed
+it with the defaults first instead of publishing the empty collections.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from content_cache import ContentCache
+
+
+CONTENT_KINDS = ("services", "projects")
+
+CONTENT_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+]
+
+META_ID = "catalog"
+
+
+class ContentStore:
+    def __init__(
+        self,
+        db,
+        cache: ContentCache,
+        build_payloads: Callable[[Dict[str, List[Dict[str, Any]]]], Dict[str, bytes]],
+        version_prefix: str = "1",
+        poll_interval: float = 30.0,
+    ):
+        self.db = db
+        self.cache = cache
+        self.build_payloads = build_payloads
+        self.version_prefix = version_prefix
+        self.poll_interval = poll_interval
+        # Catalog documents the current snapshot was built from
+        self.catalogs: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in CONTENT_KINDS}
+        # Seed data served until the first refresh, and seeded by it if still missing
+        self.defaults: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def seed(self, defaults: Dict[str, List[Dict[str, Any]]]):
+        """Fill empty catalogs with ``defaults`` and create the meta document once."""
+        next_ids = {}
+        for kind in CONTENT_KINDS:
+            collection = self.db[kind]
+            if await collection.count_documents({}, limit=1) == 0 and defaults.get(kind):
+                await collection.insert_many([dict(item) for item in defaults[kind]])
+            last = await collection.find({}, {"_id": 0, "id": 1}).sort("id", -1).to_list(1)
+            next_ids[kind] = last[0]["id"] + 1 if last else 1
+        await self.db.content_meta.update_one(
+            {"_id": META_ID},
+            {"$setOnInsert": {"version": 1, "next_ids": next_ids}},
+            upsert=True,
+        )
+
+    def use_defaults(self, defaults: Dict[str, List[Dict[str, Any]]]):
+        """Serve ``defaults`` until the first successful refresh (Mongo unavailable)."""
+        self.cache.ensure(f"{self.version_prefix}.defaults", lambda: self.build_payloads(defaults))
+        self.catalogs = defaults
+        self.defaults = defaults
+
+    async def _stored_version(self) -> Optional[str]:
+        """Version of the stored catalogs, or None if they were never seeded."""
+        meta = await self.db.content_meta.find_one({"_id": META_ID}, {"version": 1})
+        return f"{self.version_prefix}.{meta['version']}" if meta else None
+
+    async def _seed_if_missing(self) -> Optional[str]:
+        """Stored version; seeds the defaults first if the catalogs were never seeded."""
+        version = await self._stored_version()
+        if version is None and self.defaults is not None:
+            await self.seed(self.defaults)
+            version = await self._stored_version()
+        return version
+
+    async def refresh(self) -> bool:
+        """Rebuild the snapshot if the stored version changed; return True if rebuilt."""
+        version = await self._seed_if_missing()
+        if version is None or version == self.cache.version:
+            return False
+        async with self._lock:
+            # Read the version before the documents: the snapshot is at least that new
+            version = await self._stored_version()
+            if version is None or version == self.cache.version:
+                return False
+            catalogs = {}
+            for kind in CONTENT_KINDS:
+                catalogs[kind] = await self.db[kind].find({}, {"_id": 0}).sort("id", ASCENDING).to_list(None)
+            self.cache.ensure(version, lambda: self.build_payloads(catalogs))
+            self.catalogs = catalogs
+            return True
+
+    async def _changed(self):
+        await self.db.content_meta.update_one({"_id": META_ID}, {"$inc": {"version": 1}}, upsert=True)
+        await self.refresh()
+
+    async def _next_id(self, kind: str) -> int:
+        meta = await self.db.content_meta.find_one_and_update(
+            {"_id": META_ID},
+            {"$inc": {f"next_ids.{kind}": 1}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        return (meta or {}).get("next_ids", {}).get(kind) or 1
+
+    async def create(self, kind: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        # An edit must not mark an unseeded database as seeded, nor reuse a default's id
+        await self._seed_if_missing()
+        document = {"id": await self._next_id(kind), **item}
+        await self.db[kind].insert_one(document)
+        await self._changed()
+        document.pop("_id", None)
+        return document
+
+    async def replace(self, kind: str, item_id: int, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        document = {"id": item_id, **item}
+        result = await self.db[kind].replace_one({"id": item_id}, document)
+        if not result.matched_count:
+            return None
+        await self._changed()
+        return document
+
+    async def delete(self, kind: str, item_id: int) -> bool:
+        result = await self.db[kind].delete_one({"id": item_id})
+        if not result.deleted_count:
+            return False
+        await self._changed()
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error("Error reloading site content: %s", e)
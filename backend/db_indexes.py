@@ -0,0 +1,73 @@
+"""MongoDB index definitions, created once at application startup."""
+import logging
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+from content_store import CONTENT_INDEXES
+from idempotency import IDEMPOTENCY_INDEXES
+from lead_archive import LEAD_ARCHIVE_INDEXES
+from lead_stats import LEAD_STATS_INDEXES
+from notifications import LEAD_NOTIFY_INDEXES
+
+
+CONTACT_REQUEST_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    # Keyset pagination order for the admin listing: (created_at, id) descending
+    IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    IndexModel(
+        [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+        name="status_created_at_id",
+    ),
+    IndexModel(
+        [("building_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+        name="building_type_created_at_id",
+    ),
+    # Area range filters in the admin panel
+    IndexModel([("area_sqm", ASCENDING), ("created_at", DESCENDING)], name="area_sqm_created_at"),
+    # Duplicate submission lookup and the unique per-window dedupe key
+    IndexModel(
+        [("phone_e164", ASCENDING), ("content_hash", ASCENDING), ("created_at", DESCENDING)],
+        name="phone_content_hash_created_at",
+    ),
+    IndexModel(
+        [("dedupe_key", ASCENDING)],
+        name="dedupe_key_unique",
+        unique=True,
+        partialFilterExpression={"dedupe_key": {"$type": "string"}},
+    ),
+    # Full-text search for the admin panel, Russian stemming
+    IndexModel(
+        [("name", TEXT), ("message", TEXT), ("building_type", TEXT), ("area", TEXT)],
+        name="lead_text_ru",
+        default_language="russian",
+        # Leads have no per-document language; keep a stray "language" field from changing it
+        language_override="text_language",
+        weights={"name": 5, "building_type": 3, "area": 2, "message": 1},
+    ),
+    # Pending new-lead notifications (the outbox lives on the lead)
+    *LEAD_NOTIFY_INDEXES,
+]
+
+
+COLLECTION_INDEXES = {
+    "contact_requests": CONTACT_REQUEST_INDEXES,
+    "contact_requests_archive": LEAD_ARCHIVE_INDEXES,
+    "lead_stats": LEAD_STATS_INDEXES,
+    "services": CONTENT_INDEXES,
+    "projects": CONTENT_INDEXES,
+    "idempotency_keys": IDEMPOTENCY_INDEXES,
+}
+
+
+async def ensure_indexes(db) -> bool:
+    """Create missing indexes; existing ones with the same spec are a no-op.
+
+    Returns False (after logging) at the first failure, e.g. when Mongo is down.
+    """
+    for name, indexes in COLLECTION_INDEXES.items():
+        try:
+            await db[name].create_indexes(indexes)
+        except Exception as e:
+            logging.error("Error creating %s indexes: %s", name, e)
+            return False
+    return True
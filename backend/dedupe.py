@@ -0,0 +1,96 @@
+"""Duplicate contact form submission detection.
+
+A lead is a duplicate when another lead with the same canonical phone and
+content hash was created within the dedupe window. Recent leads are kept in a
+bounded in-process LRU/TTL cache; on a miss the detector falls back to an
+indexed MongoDB lookup. A unique ``dedupe_key`` (hash plus window bucket)
+closes the race between concurrent identical submissions.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from ttl_cache import TTLCache
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join(value.split()).casefold() if value else ""
+
+
+def lead_content_hash(
+    phone_e164: Optional[str],
+    name: str,
+    email_normalized: Optional[str],
+    building_type: Optional[str],
+    area: Optional[str],
+    message: Optional[str],
+) -> str:
+    parts = (phone_e164 or "", name, email_normalized, building_type, area, message)
+    raw = "\x1f".join(_normalize(part) for part in parts)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def dedupe_key(content_hash: str, created_at: datetime, window_seconds: int) -> str:
+    bucket = int(created_at.timestamp()) // window_seconds
+    return f"{content_hash}:{bucket}"
+
+
+class DuplicateDetector:
+    def __init__(self, collection, window_seconds: int, cache_size: int = 10000):
+        self.collection = collection
+        self.window_seconds = window_seconds
+        # (phone, content hash) -> request id
+        self.cache = TTLCache(cache_size, window_seconds)
+
+    async def find_original(self, phone_e164: str, content_hash: str, cached_only: bool = False) -> Optional[str]:
+        """Return the request id of an identical lead inside the window, if any.
+
+        ``cached_only`` skips the MongoDB fallback (used while Mongo is down).
+        """
+        key = (phone_e164, content_hash)
+        request_id = self.cache.get(key)
+        if request_id is not None or cached_only:
+            return request_id
+        since = datetime.utcnow() - timedelta(seconds=self.window_seconds)
+        doc = await self.collection.find_one(
+            {"phone_e164": phone_e164, "content_hash": content_hash, "created_at": {"$gte": since}},
+            {"_id": 0, "id": 1},
+            sort=[("created_at", -1)],
+        )
+        if doc is None:
+            return None
+        self.cache.put(key, doc["id"])
+        return doc["id"]
+
+    async def find_by_dedupe_key(self, key: str) -> Optional[str]:
+        doc = await self.collection.find_one({"dedupe_key": key}, {"_id": 0, "id": 1})
+        return doc["id"] if doc else None
+
+    async def resolve_conflict(self, phone_e164: str, content_hash: str, key: str) -> Optional[str]:
+        """Return the id of the lead stored under ``key`` and point the cache at it.
+
+        Used after an insert failed on the unique ``dedupe_key``: an identical
+        lead from another worker was stored first, so the id this process
+        claimed will never exist.
+        """
+        original_id = await self.find_by_dedupe_key(key)
+        self.forget(phone_e164, content_hash)
+        if original_id is not None:
+            self.claim(phone_e164, content_hash, original_id)
+        return original_id
+
+    def claim(self, phone_e164: str, content_hash: str, request_id: str) -> Optional[str]:
+        """Reserve the key for ``request_id``; return the id of an earlier claim instead.
+
+        Called without awaiting after ``find_original``, so concurrent identical
+        submissions in this process cannot both pass the check.
+        """
+        key = (phone_e164, content_hash)
+        existing = self.cache.get(key)
+        if existing is not None:
+            return existing
+        self.cache.put(key, request_id)
+        return None
+
+    def forget(self, phone_e164: str, content_hash: str):
+        self.cache.pop((phone_e164, content_hash))
@@ -0,0 +1,116 @@
+"""Hangar cost estimates from precomputed per-building-type pricing tables.
+
+A table is built once per content version from the services catalog: every
+service item (building type) gets a price-per-m² range for each frame
+(arched, straight-wall) and insulation (cold, insulated) combination.
+Estimates scale that range by an area tier and are memoized in an LRU cache
+keyed by content version, so repeated calculator requests (every slider move)
+are dictionary hits. Area is rounded before lookup to keep the cache small.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+FRAMES = ("arched", "straight")
+INSULATIONS = ("cold", "insulated")
+
+# Base price range for a straight-wall cold hangar, RUB per m² (turnkey, with foundation)
+BASE_PRICE_PER_SQM = (6500, 8500)
+
+FRAME_FACTORS = {"arched": 0.8, "straight": 1.0}
+INSULATION_FACTORS = {"cold": 1.0, "insulated": 1.45}
+
+# Service category -> price factor; unknown categories use 1.0
+CATEGORY_FACTORS = {
+    "Промышленные объекты": 1.0,
+    "Коммерческие объекты": 1.15,
+    "Спортивные сооружения": 1.2,
+    "Сельскохозяйственные объекты": 0.85,
+    "Специализированные ангары": 1.3,
+}
+
+# Building types priced differently from the rest of their category
+ITEM_FACTORS = {
+    "Открытые навесы": 0.55,
+    "Теплицы": 0.7,
+    "Ангары для авиации": 1.25,
+}
+
+# (upper area bound in m², factor): small buildings cost more per m²
+AREA_TIERS = ((300, 1.25), (1000, 1.1), (3000, 1.0), (10000, 0.92), (float("inf"), 0.85))
+
+AREA_STEP_SQM = 10
+PRICE_STEP = 1000
+
+PricingTable = Dict[str, Dict[Tuple[str, str], Tuple[float, float]]]
+
+
+class UnknownBuildingType(ValueError):
+    pass
+
+
+def build_pricing_table(services: List[Dict[str, Any]]) -> PricingTable:
+    table: PricingTable = {}
+    low, high = BASE_PRICE_PER_SQM
+    for service in services:
+        category_factor = CATEGORY_FACTORS.get(service["category"], 1.0)
+        for item in service["items"]:
+            factor = category_factor * ITEM_FACTORS.get(item, 1.0)
+            table[item] = {
+                (frame, insulation): (
+                    low * factor * FRAME_FACTORS[frame] * INSULATION_FACTORS[insulation],
+                    high * factor * FRAME_FACTORS[frame] * INSULATION_FACTORS[insulation],
+                )
+                for frame in FRAMES
+                for insulation in INSULATIONS
+            }
+    return table
+
+
+def area_factor(area_sqm: float) -> float:
+    for upper, factor in AREA_TIERS:
+        if area_sqm <= upper:
+            return factor
+    return AREA_TIERS[-1][1]
+
+
+def _round_price(value: float) -> int:
+    return int(round(value / PRICE_STEP) * PRICE_STEP)
+
+
+class EstimateEngine:
+    def __init__(self, cache_size: int = 4096):
+        self.version: Optional[str] = None
+        self._table: PricingTable = {}
+        self._estimate = lru_cache(maxsize=cache_size)(self._compute)
+
+    def ensure(self, version: str, services: List[Dict[str, Any]]):
+        """Rebuild the pricing table when the content version changes."""
+        if version != self.version:
+            self._table, self.version = build_pricing_table(services), version
+
+    @property
+    def building_types(self) -> List[str]:
+        return list(self._table)
+
+    def estimate(self, building_type: str, area_sqm: float, frame: str, insulation: str) -> Dict[str, Any]:
+        area = max(AREA_STEP_SQM, round(area_sqm / AREA_STEP_SQM) * AREA_STEP_SQM)
+        # The version is part of the key, so entries from an old catalog are never returned
+        return self._estimate(self.version, building_type, area, frame, insulation)
+
+    def _compute(self, version: str, building_type: str, area: int, frame: str, insulation: str) -> Dict[str, Any]:
+        prices = self._table.get(building_type)
+        if prices is None:
+            raise UnknownBuildingType(building_type)
+        low, high = prices[(frame, insulation)]
+        factor = area_factor(area)
+        return {
+            "building_type": building_type,
+            "area_sqm": area,
+            "frame": frame,
+            "insulation": insulation,
+            "price_per_sqm_min": int(round(low * factor, -1)),
+            "price_per_sqm_max": int(round(high * factor, -1)),
+            "price_min": _round_price(low * factor * area),
+            "price_max": _round_price(high * factor * area),
+            "currency": "RUB",
+        }
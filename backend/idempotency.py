@@ -0,0 +1,142 @@
+"""Idempotency-Key handling for POST /api/contact-form.
+
+The first successful response for a key is stored in the TTL-indexed
+``idempotency_keys`` collection (shared by all workers) and in a bounded
+in-process cache, and replayed for every retry with the same key. A key is
+claimed in Mongo with a pending document before the handler runs, so only
+one request per key does the work: concurrent duplicates in this process
+await the same future, duplicates on other workers poll the pending document
+until the response is stored. A pending claim whose lease ran out (the worker
+died mid-request) is taken over by the next retry.
+"""
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from ttl_cache import TTLCache
+
+
+IDEMPOTENCY_INDEXES = [
+    IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+]
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different body."""
+
+
+class IdempotencyInProgress(Exception):
+    """Another worker is still processing the first request with this key."""
+
+
+def request_fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        collection,
+        ttl_seconds: int = 86400,
+        cache_size: int = 10000,
+        lease_seconds: float = 30.0,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.1,
+    ):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        # key -> (fingerprint, response)
+        self.cache = TTLCache(cache_size, ttl_seconds)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def run(
+        self, key: str, fingerprint: str, handler: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Return (response, replayed); ``handler`` runs at most once per key."""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self._replay(fingerprint, *cached), True
+        future = self._in_flight.get(key)
+        if future is not None:
+            stored_fingerprint, response = await asyncio.shield(future)
+            return self._replay(fingerprint, stored_fingerprint, response), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            stored = await self._claim(key, fingerprint)
+            if stored is not None:
+                result, replayed = stored, True
+            else:
+                try:
+                    response = await handler()
+                except BaseException:
+                    # Let a later retry with this key run the request again
+                    await self.collection.delete_one({"_id": key, "status": "pending"})
+                    raise
+                await self.collection.update_one(
+                    {"_id": key},
+                    {"$set": {"status": "completed", "response": response}, "$unset": {"lease_until": ""}},
+                )
+                result, replayed = (fingerprint, response), False
+            self.cache.put(key, result)
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; retrieve it here so an unawaited future does not warn
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+        return self._replay(fingerprint, *result), replayed
+
+    @staticmethod
+    def _replay(fingerprint: str, stored_fingerprint: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        if fingerprint != stored_fingerprint:
+            raise IdempotencyKeyReused()
+        return response
+
+    async def _claim(self, key: str, fingerprint: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Claim ``key`` for this request, or return the stored (fingerprint, response)."""
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            now = datetime.utcnow()
+            try:
+                await self.collection.insert_one(
+                    {
+                        "_id": key,
+                        "status": "pending",
+                        "fingerprint": fingerprint,
+                        "created_at": now,
+                        "lease_until": now + timedelta(seconds=self.lease_seconds),
+                        "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                    }
+                )
+                return None
+            except DuplicateKeyError:
+                pass
+            doc = await self.collection.find_one({"_id": key})
+            if doc is None:
+                continue  # expired or released between the insert and the read
+            if doc["status"] == "completed":
+                return doc["fingerprint"], doc["response"]
+            if doc["fingerprint"] != fingerprint:
+                raise IdempotencyKeyReused()
+            if doc["lease_until"] < now:
+                taken = await self.collection.update_one(
+                    {"_id": key, "status": "pending", "lease_until": doc["lease_until"]},
+                    {"$set": {"lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                )
+                if taken.modified_count:
+                    return None
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress()
+            await asyncio.sleep(self.poll_interval)
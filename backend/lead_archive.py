@@ -0,0 +1,130 @@
+"""Background archival of old leads into ``contact_requests_archive``.
+
+Leads older than the retention age are moved in bounded batches: a batch is
+copied into the archive with a trimmed schema (derived and dedupe fields are
+dropped), then deleted from ``contact_requests``. A crash between the two
+steps only repeats the copy, which the unique ``id`` index turns into a
+no-op. The worker pauses between batches and caps the batches per run, so it
+never competes with live traffic for long.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import BulkWriteError
+
+from mongo_errors import partition_write_errors
+
+ARCHIVE_FIELDS = (
+    "id",
+    "name",
+    "phone",
+    "email",
+    "building_type",
+    "area",
+    "area_sqm",
+    "message",
+    "status",
+    "status_changed_at",
+    "created_at",
+)
+ARCHIVE_PROJECTION = {"_id": 0, **{field: 1 for field in ARCHIVE_FIELDS}}
+
+LEAD_ARCHIVE_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    IndexModel(
+        [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+        name="status_created_at_id",
+    ),
+]
+
+
+def trim_lead(lead: Dict[str, Any], archived_at: datetime) -> Dict[str, Any]:
+    doc = {field: lead[field] for field in ARCHIVE_FIELDS if lead.get(field) is not None}
+    doc["archived_at"] = archived_at
+    return doc
+
+
+class LeadArchiver:
+    def __init__(
+        self,
+        leads,
+        archive,
+        max_age_days: int,
+        batch_size: int = 500,
+        max_batches: int = 20,
+        pause: float = 1.0,
+        interval: float = 3600.0,
+    ):
+        self.leads = leads
+        self.archive = archive
+        self.max_age = timedelta(days=max_age_days)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.pause = pause
+        self.interval = interval
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        self._stopping.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def archive_batch(self, cutoff: datetime) -> int:
+        """Move up to ``batch_size`` leads created before ``cutoff``; return how many."""
+        query = {"created_at": {"$lt": cutoff}}
+        batch: List[Dict[str, Any]] = (
+            await self.leads.find(query, ARCHIVE_PROJECTION)
+            .sort("created_at", ASCENDING)
+            .limit(self.batch_size)
+            .to_list(None)
+        )
+        if not batch:
+            return 0
+        now = datetime.utcnow()
+        try:
+            await self.archive.insert_many([trim_lead(lead, now) for lead in batch], ordered=False)
+        except BulkWriteError as e:
+            # Already archived by an interrupted run; anything else keeps the leads in place
+            _, failed = partition_write_errors(e)
+            if failed:
+                raise
+        ids = [lead["id"] for lead in batch]
+        result = await self.leads.delete_many({"id": {"$in": ids}, **query})
+        return result.deleted_count
+
+    async def archive_once(self) -> int:
+        """One rate-limited run: at most ``max_batches`` batches."""
+        cutoff = datetime.utcnow() - self.max_age
+        moved = 0
+        for _ in range(self.max_batches):
+            if self._stopping.is_set():
+                break
+            count = await self.archive_batch(cutoff)
+            moved += count
+            if count < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+        return moved
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                moved = await self.archive_once()
+                if moved:
+                    logging.info("Archived %s contact requests older than %s days", moved, self.max_age.days)
+            except Exception as e:
+                logging.error("Error archiving contact requests: %s", e)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,61 @@
+"""In-process broadcast of new leads to Server-Sent Events subscribers.
+
+Each admin connection gets its own bounded queue. ``publish`` never blocks:
+an event is encoded once and offered to every queue, and a subscriber whose
+queue is full is dropped (its stream ends and the browser's EventSource
+reconnects). Idle streams get a comment heartbeat so proxies keep them open.
+
+The hub only sees leads accepted by the same worker process.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Dict, Set
+
+import orjson
+
+
+class Subscriber:
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class LeadBroadcastHub:
+    def __init__(self, queue_size: int = 100, heartbeat: float = 15.0, retry_ms: int = 3000):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.retry_ms = retry_ms
+        self._subscribers: Set[Subscriber] = set()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def publish(self, lead: Dict[str, Any]):
+        if not self._subscribers:
+            return
+        event = b"id: " + lead["id"].encode() + b"\nevent: lead\ndata: " + orjson.dumps(lead) + b"\n\n"
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop it instead of buffering without bound
+                subscriber.dropped = True
+                self._subscribers.discard(subscriber)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        try:
+            yield f"retry: {self.retry_ms}\n\n".encode()
+            while not subscriber.dropped:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+                    continue
+                if subscriber.dropped:
+                    break
+                yield event
+        finally:
+            self._subscribers.discard(subscriber)
@@ -0,0 +1,69 @@
+"""Streaming NDJSON/CSV export of contact requests.
+
+Documents are read straight from a Motor cursor with a projection and encoded
+into bounded output buffers, so memory use does not grow with the number of
+exported leads.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator
+
+
+EXPORT_FIELDS = [
+    "id",
+    "name",
+    "phone",
+    "phone_e164",
+    "email",
+    "email_normalized",
+    "building_type",
+    "area",
+    "area_sqm",
+    "message",
+    "status",
+    "created_at",
+]
+EXPORT_PROJECTION = {"_id": 0, **{field: 1 for field in EXPORT_FIELDS}}
+
+# Flush the output buffer to the client once it grows past this many bytes
+FLUSH_BYTES = 64 * 1024
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def export_ndjson(cursor) -> AsyncIterator[bytes]:
+    buffer = []
+    size = 0
+    async for doc in cursor:
+        line = json.dumps(doc, ensure_ascii=False, default=_json_default).encode() + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+async def export_csv(cursor) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    async for doc in cursor:
+        created_at = doc.get("created_at")
+        writer.writerow([
+            created_at.isoformat() if field == "created_at" and created_at else doc.get(field)
+            for field in EXPORT_FIELDS
+        ])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
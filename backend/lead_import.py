@@ -0,0 +1,232 @@
+"""Streaming bulk import of contact requests from CSV or NDJSON bodies.
+
+The request body is decoded incrementally and never held in memory as a
+whole: rows are parsed as lines arrive, validated one by one and written with
+``insert_many`` in chunks. The insert for one chunk overlaps with parsing and
+validating the next one.
+"""
+import asyncio
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from mongo_errors import DUPLICATE_KEY_ERROR
+
+
+# snake_case keys map to form fields; CSV headers are also matched case-insensitively
+FIELD_ALIASES = {
+    "building_type": "buildingType",
+    "buildingtype": "buildingType",
+}
+
+# A quoted CSV field still open after this many lines is taken to be an
+# unterminated quote, so a stray quote cannot make the rest of the body pile up
+MAX_QUOTED_FIELD_LINES = 100
+
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+async def iter_line_blocks(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[str]]:
+    """Decode body chunks and yield the complete lines of each chunk as a list."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        if lines:
+            yield lines
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield [tail]
+
+
+async def iter_ndjson_rows(blocks: AsyncIterator[List[str]]) -> AsyncIterator[Row]:
+    row_number = 0
+    async for lines in blocks:
+        for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, f"Неверный JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield row_number, None, "Строка должна быть JSON-объектом"
+                continue
+            yield row_number, {FIELD_ALIASES.get(key, key): value for key, value in row.items()}, None
+
+
+def _ends_in_quoted_field(line: str, in_quotes: bool) -> bool:
+    """Whether a quoted field is still open at the end of ``line``.
+
+    Only a quote at the start of a field opens one, as in csv.reader, so a
+    quote inside an unquoted field (``труба 5" дюймов``) is a plain character.
+    """
+    i = 0
+    while True:
+        if in_quotes:
+            end = line.find('"', i)
+            if end < 0:
+                return True
+            if line.startswith('"', end + 1):
+                i = end + 2  # escaped quote
+                continue
+            in_quotes = False
+            i = line.find(",", end + 1)
+            if i < 0:
+                return False
+            i += 1
+        elif line.startswith('"', i):
+            in_quotes = True
+            i += 1
+        else:
+            i = line.find(",", i)
+            if i < 0:
+                return False
+            i += 1
+
+
+def _split_records(lines: List[str], pending: List[str]) -> Tuple[List[str], List[str]]:
+    """Split lines into those ending a record and the lines of a still-open quoted field."""
+    complete: List[str] = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        if not _ends_in_quoted_field(line, bool(pending)):
+            complete += pending
+            complete.append(line)
+            pending = []
+            continue
+        pending.append(line)
+        if len(pending) > MAX_QUOTED_FIELD_LINES:
+            # Unterminated quote: close it at the end of its line and scan
+            # the lines after it again
+            complete.append(pending[0] + '"')
+            lines, i, pending = pending[1:] + lines[i:], 0, []
+    return complete, pending
+
+
+async def iter_csv_records(blocks: AsyncIterator[List[str]]) -> AsyncIterator[List[str]]:
+    # A quoted field may contain newlines, so a record's lines are handed to
+    # csv.reader once its last quoted field is closed; the lines of a record
+    # still open are carried over to the next block.
+    pending: List[str] = []
+    async for lines in blocks:
+        complete, pending = _split_records(lines, pending)
+        for record in csv.reader(line + "\n" for line in complete):
+            if record:
+                yield record
+    if pending:
+        for record in csv.reader(line + "\n" for line in pending):
+            if record:
+                yield record
+
+
+async def iter_csv_rows(blocks: AsyncIterator[List[str]]) -> AsyncIterator[Row]:
+    header: Optional[List[str]] = None
+    row_number = 0
+    async for record in iter_csv_records(blocks):
+        if header is None:
+            header = [column.strip().lower() for column in record]
+            header = [FIELD_ALIASES.get(key, key) for key in header]
+            continue
+        row_number += 1
+        if len(record) > len(header):
+            yield row_number, None, "Лишние колонки в строке"
+            continue
+        row = {key: value for key, value in zip(header, record) if value != ""}
+        yield row_number, row, None
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in error.errors()
+    )
+
+
+class LeadImporter:
+    """Validates parsed rows and writes valid ones with chunked ``insert_many``."""
+
+    def __init__(
+        self,
+        collection,
+        build_document: Callable[[Dict[str, Any]], Dict[str, Any]],
+        chunk_size: int = 1000,
+        max_errors: int = 1000,
+        after_insert: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+    ):
+        self.collection = collection
+        self.build_document = build_document
+        self.after_insert = after_insert
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.errors_truncated = False
+        self._pending_insert: Optional[asyncio.Task] = None
+
+    def _record_error(self, row_number: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "error": message})
+        else:
+            self.errors_truncated = True
+
+    async def _insert_chunk(self, docs: List[Dict[str, Any]], row_numbers: List[int]):
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            for err in write_errors:
+                if err.get("code") == DUPLICATE_KEY_ERROR:
+                    message = "Дубликат заявки"
+                else:
+                    message = err.get("errmsg", "Ошибка записи")
+                self._record_error(row_numbers[err["index"]], message)
+            failed = {err["index"] for err in write_errors}
+            docs = [doc for i, doc in enumerate(docs) if i not in failed]
+        self.inserted += len(docs)
+        if docs and self.after_insert is not None:
+            await self.after_insert(docs)
+
+    async def _flush(self, docs: List[Dict[str, Any]], row_numbers: List[int]):
+        # Keep at most one insert in flight while the next chunk is validated
+        if self._pending_insert is not None:
+            await self._pending_insert
+        self._pending_insert = asyncio.create_task(self._insert_chunk(docs, row_numbers)) if docs else None
+
+    async def run(self, rows: AsyncIterator[Row]) -> Dict[str, Any]:
+        docs: List[Dict[str, Any]] = []
+        row_numbers: List[int] = []
+        async for row_number, row, parse_error in rows:
+            self.received += 1
+            if parse_error is not None:
+                self._record_error(row_number, parse_error)
+                continue
+            try:
+                docs.append(self.build_document(row))
+                row_numbers.append(row_number)
+            except ValidationError as e:
+                self._record_error(row_number, format_validation_error(e))
+                continue
+            if len(docs) >= self.chunk_size:
+                await self._flush(docs, row_numbers)
+                docs, row_numbers = [], []
+        await self._flush(docs, row_numbers)
+        await self._flush([], [])
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
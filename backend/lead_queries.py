@@ -0,0 +1,94 @@
+"""Filters and keyset (cursor) pagination for contact request queries."""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DESCENDING
+
+
+# Sort order shared by every paginated lead query; matches the compound indexes
+LEAD_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, lead_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), lead_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, lead_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(lead_id)
+    except Exception:
+        raise InvalidCursor("Неверный курсор пагинации")
+
+
+def build_lead_filter(
+    status: Optional[str] = None,
+    building_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    area_min: Optional[float] = None,
+    area_max: Optional[float] = None,
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if status:
+        query["status"] = status
+    if building_type:
+        query["building_type"] = building_type
+    if created_from or created_to:
+        created: Dict[str, datetime] = {}
+        if created_from:
+            created["$gte"] = created_from
+        if created_to:
+            created["$lt"] = created_to
+        query["created_at"] = created
+    if area_min is not None or area_max is not None:
+        area: Dict[str, float] = {}
+        if area_min is not None:
+            area["$gte"] = area_min
+        if area_max is not None:
+            area["$lte"] = area_max
+        query["area_sqm"] = area
+    return query
+
+
+# Fields returned by the admin list view and search results
+LIST_VIEW_FIELDS = ("id", "name", "phone", "email", "building_type", "area", "area_sqm", "status", "version", "created_at")
+
+# The admin list also shows the message; derived and dedupe fields are never read
+ADMIN_LIST_FIELDS = LIST_VIEW_FIELDS + ("message", "status_changed_at")
+ADMIN_LIST_PROJECTION = {"_id": 0, **{field: 1 for field in ADMIN_LIST_FIELDS}}
+
+
+def text_search(
+    query_text: str, status: Optional[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any], List[Tuple[str, Any]]]:
+    """Filter, projection and sort for a ranked ``$text`` search."""
+    query: Dict[str, Any] = {"$text": {"$search": query_text}}
+    if status:
+        query["status"] = status
+    projection: Dict[str, Any] = {"_id": 0, "score": {"$meta": "textScore"}}
+    projection.update({field: 1 for field in LIST_VIEW_FIELDS})
+    sort = [("score", {"$meta": "textScore"}), ("created_at", DESCENDING)]
+    return query, projection, sort
+
+
+def apply_cursor(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Restrict ``query`` to documents strictly after ``cursor`` in LEAD_SORT order."""
+    if not cursor:
+        return query
+    created_at, lead_id = decode_cursor(cursor)
+    after = {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": lead_id}},
+        ]
+    }
+    return {"$and": [query, after]} if query else after
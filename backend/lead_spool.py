@@ -0,0 +1,307 @@
+"""Local spool for contact requests while MongoDB is unavailable.
+
+A ``CircuitBreaker`` tracks consecutive Mongo write failures. Once it opens,
+the contact form stops waiting on Mongo and appends each validated lead to a
+local append-only journal (one extended-JSON line per lead, fsync'd before
+the form answers), so an outage costs a few milliseconds per lead instead of
+a lost customer.
+
+Every worker process appends to its own journal, locked with ``flock`` while
+it is open. ``LeadSpool`` also replays journals in the background: when the
+breaker lets a probe through it takes over each journal no live process
+holds, renames it aside, bulk-inserts its leads and deletes it once every
+lead is stored. Leads carry their final ``id``, so a replay repeated after a
+crash (or a lead whose original insert did reach Mongo after timing out)
+hits the unique ``id`` index and is skipped; replays wait until that index
+exists. A torn last line from a crash mid-append is logged and ignored.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError, ConnectionFailure
+
+from mongo_errors import partition_write_errors
+
+
+# Errors that mean "Mongo is unreachable or too slow", as opposed to a bad write
+UNAVAILABLE_ERRORS = (ConnectionFailure, asyncio.TimeoutError)
+
+_JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+
+JOURNAL_SUFFIX = ".jsonl"
+REPLAYING_SUFFIX = ".replaying"
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures.
+
+    While open, ``allow`` refuses calls; once ``reset_timeout`` seconds have
+    passed it lets one probe through and re-arms the timer, so at most one
+    probe runs per ``reset_timeout``. A successful call closes the breaker, a
+    failed one keeps it open.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self.reset_timeout:
+            return False
+        self._opened_at = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self._opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logging.error("MongoDB circuit opened after %s failures; spooling contact requests", self.failures)
+            self._opened_at = time.monotonic()
+
+    async def call(self, operation: Awaitable[Any], timeout: float) -> Any:
+        """Await ``operation`` with a timeout and record whether Mongo answered."""
+        try:
+            result = await asyncio.wait_for(operation, timeout)
+        except UNAVAILABLE_ERRORS:
+            self.record_failure()
+            raise
+        except Exception:
+            # Mongo answered, e.g. with a duplicate key error
+            self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+class LeadSpool:
+    """Per-process journal of spooled leads plus a replayer for all of them.
+
+    ``path`` names the spool, e.g. ``spool/contact_requests.jsonl``; each
+    process appends to its own ``contact_requests.<pid>.jsonl`` next to it and
+    holds an exclusive ``flock`` on it while the file is open. The replayer
+    takes over every journal in the directory whose lock it can get: its own,
+    and those left behind by exited or crashed workers.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        collection,
+        breaker: CircuitBreaker,
+        batch_size: int = 500,
+        interval: float = 5.0,
+        after_insert: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+        ready: Optional[asyncio.Event] = None,
+    ):
+        self.directory = os.path.dirname(os.path.abspath(path))
+        stem = os.path.basename(path)
+        self.stem = stem[: -len(JOURNAL_SUFFIX)] if stem.endswith(JOURNAL_SUFFIX) else stem
+        self.journal_path = os.path.join(self.directory, f"{self.stem}.{os.getpid()}{JOURNAL_SUFFIX}")
+        self.collection = collection
+        self.breaker = breaker
+        self.batch_size = batch_size
+        self.interval = interval
+        self.after_insert = after_insert
+        # Set once the unique indexes the replay relies on exist
+        self.ready = ready
+        self._lock = asyncio.Lock()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._fd: Optional[int] = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        self._stopping.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        async with self._lock:
+            self._close_fd()
+
+    def journals(self) -> List[str]:
+        """Journals and interrupted replays of every process sharing the spool."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in names
+            if (name == self.stem + JOURNAL_SUFFIX or name.startswith(self.stem + "."))
+            and (name.endswith(JOURNAL_SUFFIX) or name.endswith(REPLAYING_SUFFIX))
+        )
+
+    def pending(self) -> bool:
+        return bool(self.journals())
+
+    def writable(self) -> bool:
+        """Whether new leads can be journaled, i.e. the spool directory accepts files."""
+        return os.access(self.directory, os.W_OK | os.X_OK)
+
+    async def append(self, doc: Dict[str, Any]):
+        """Durably append ``doc``; returns once the line is fsync'd."""
+        await self.append_many([doc])
+
+    async def append_many(self, docs: List[Dict[str, Any]]):
+        lines = b"".join((json_util.dumps(doc, json_options=_JSON_OPTIONS) + "\n").encode() for doc in docs)
+        async with self._lock:
+            await asyncio.to_thread(self._write, lines)
+
+    def _write(self, line: bytes):
+        if self._fd is None:
+            self._fd = self._open_journal()
+            size = os.fstat(self._fd).st_size
+            if size and os.pread(self._fd, 1, size - 1) != b"\n":
+                # Terminate a line torn by a crash so this lead stays readable
+                line = b"\n" + line
+        os.write(self._fd, line)
+        os.fsync(self._fd)
+
+    def _open_journal(self) -> int:
+        while True:
+            fd = os.open(self.journal_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                # A replayer may have moved the file aside between the open and the lock
+                if os.fstat(fd).st_ino == os.stat(self.journal_path).st_ino:
+                    _fsync_dir(self.journal_path)
+                    return fd
+            except (BlockingIOError, FileNotFoundError):
+                pass
+            os.close(fd)
+            time.sleep(0.001)
+
+    def _close_fd(self):
+        if self._fd is not None:
+            os.close(self._fd)  # also releases the flock
+            self._fd = None
+
+    async def replay(self) -> int:
+        """Insert the leads of every journal not held by a live process; return how many were newly stored."""
+        stored = 0
+        for path in self.journals():
+            if path == self.journal_path:
+                # New leads of this process go to a fresh journal while this one is replayed
+                async with self._lock:
+                    self._close_fd()
+                    claimed = self._claim(path)
+            else:
+                claimed = self._claim(path)
+            if claimed is None:
+                continue
+            journal, replay_path = claimed
+            with journal:
+                stored += await self._replay_journal(journal, replay_path)
+                os.remove(replay_path)
+        return stored
+
+    @staticmethod
+    def _claim(path: str):
+        """Lock ``path`` and move it aside for replay; None while another process holds it."""
+        try:
+            journal = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if os.fstat(journal.fileno()).st_ino != os.stat(path).st_ino:
+                raise FileNotFoundError(path)
+        except (BlockingIOError, FileNotFoundError):
+            # Still being written, or replayed (and maybe removed) by another process
+            journal.close()
+            return None
+        if path.endswith(REPLAYING_SUFFIX):
+            return journal, path
+        replay_path = f"{path}.{time.time_ns()}{REPLAYING_SUFFIX}"
+        os.replace(path, replay_path)
+        _fsync_dir(path)
+        return journal, replay_path
+
+    async def _replay_journal(self, journal, replay_path: str) -> int:
+        stored = 0
+        batch: List[Dict[str, Any]] = []
+        for number, line in enumerate(journal, 1):
+            try:
+                batch.append(json_util.loads(line, json_options=_JSON_OPTIONS))
+            except ValueError:
+                logging.error("Skipping unreadable line %s in %s", number, replay_path)
+                continue
+            if len(batch) >= self.batch_size:
+                stored += await self._insert(batch)
+                batch = []
+        if batch:
+            stored += await self._insert(batch)
+        return stored
+
+    async def _insert(self, batch: List[Dict[str, Any]]) -> int:
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            inserted = batch
+        except BulkWriteError as e:
+            # Mongo answered, so it is reachable again
+            self.breaker.record_success()
+            # Duplicates are leads that are already stored; anything else stays spooled
+            duplicates, failed = partition_write_errors(e)
+            if failed:
+                raise
+            inserted = [doc for i, doc in enumerate(batch) if i not in duplicates]
+        else:
+            self.breaker.record_success()
+        if inserted and self.after_insert is not None:
+            try:
+                await self.after_insert(inserted)
+            except Exception as e:
+                logging.error("Error in spooled contact request after-insert hook: %s", e)
+        return len(inserted)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            ready = self.ready is None or self.ready.is_set()
+            if ready and self.pending() and self.breaker.allow():
+                try:
+                    stored = await self.replay()
+                    if stored:
+                        logging.info("Replayed %s spooled contact requests", stored)
+                except UNAVAILABLE_ERRORS as e:
+                    self.breaker.record_failure()
+                    logging.error("MongoDB still unavailable, keeping spooled contact requests: %s", e)
+                except Exception as e:
+                    logging.error("Error replaying spooled contact requests: %s", e)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _fsync_dir(path: str):
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,212 @@
+"""Incrementally maintained lead counters per status, building type and day.
+
+Counters live in the ``lead_stats`` collection, one small document per
+(dimension, key). Inserts and status changes apply ``$inc`` upserts in a single
+``bulk_write``, so dashboard reads touch only the counter documents instead of
+scanning ``contact_requests``. New leads are counted off the request path:
+``LeadStatsRecorder`` accumulates their increments in memory and a background
+task flushes them periodically, merging many leads into one ``bulk_write``.
+``rebuild_stats`` recomputes everything with an
+aggregation pipeline for backfills:
+
+    python lead_stats.py rebuild
+"""
+import asyncio
+import logging
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+
+LEAD_STATS_INDEXES = [
+    IndexModel([("dimension", ASCENDING), ("key", ASCENDING)], name="dimension_key"),
+]
+
+UNSPECIFIED = "unspecified"
+
+
+def _day(created_at: datetime) -> str:
+    return created_at.strftime("%Y-%m-%d")
+
+
+def _counter_ops(counts: Counter) -> List[UpdateOne]:
+    return [
+        UpdateOne(
+            {"_id": f"{dimension}:{key}"},
+            {"$inc": {"count": amount}, "$setOnInsert": {"dimension": dimension, "key": key}},
+            upsert=True,
+        )
+        for (dimension, key), amount in counts.items()
+        if amount
+    ]
+
+
+def _insert_counts(leads: Iterable[Dict[str, Any]], counts: Optional[Counter] = None) -> Counter:
+    counts = Counter() if counts is None else counts
+    for lead in leads:
+        counts[("total", "all")] += 1
+        counts[("status", lead.get("status") or "new")] += 1
+        counts[("building_type", lead.get("building_type") or UNSPECIFIED)] += 1
+        counts[("day", _day(lead["created_at"]))] += 1
+    return counts
+
+
+async def record_inserts(stats_collection, leads: Iterable[Dict[str, Any]]):
+    ops = _counter_ops(_insert_counts(leads))
+    if ops:
+        await stats_collection.bulk_write(ops, ordered=False)
+
+
+class LeadStatsRecorder:
+    """Buffers insert counters in memory and flushes them every ``interval`` seconds.
+
+    A failed flush keeps the increments for the next one; the flusher runs a
+    last flush when it is closed.
+    """
+
+    def __init__(self, stats_collection, interval: float = 1.0):
+        self.collection = stats_collection
+        self.interval = interval
+        self._pending: Counter = Counter()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        self._stopping.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def add_inserts(self, leads: Iterable[Dict[str, Any]]):
+        _insert_counts(leads, self._pending)
+
+    async def flush(self):
+        counts, self._pending = self._pending, Counter()
+        ops = _counter_ops(counts)
+        if not ops:
+            return
+        try:
+            await self.collection.bulk_write(ops, ordered=False)
+        except Exception:
+            # Retried with the next flush; a partly applied batch may then
+            # over-count until the next rebuild
+            self._pending.update(counts)
+            raise
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error("Error updating lead stats: %s", e)
+
+
+async def record_status_changes(stats_collection, changes: Iterable[Tuple[str, str]]):
+    """Move counts between statuses for (old status, new status) pairs."""
+    counts: Counter = Counter()
+    for old, new in changes:
+        counts[("status", old)] -= 1
+        counts[("status", new)] += 1
+    ops = _counter_ops(counts)
+    if ops:
+        await stats_collection.bulk_write(ops, ordered=False)
+
+
+async def read_stats(stats_collection, days: int = 30) -> Dict[str, Any]:
+    since = _day(datetime.utcnow() - timedelta(days=days - 1))
+    query = {"$or": [{"dimension": {"$ne": "day"}}, {"dimension": "day", "key": {"$gte": since}}]}
+    result: Dict[str, Any] = {"total": 0, "by_status": {}, "by_building_type": {}, "by_day": {}}
+    async for doc in stats_collection.find(query):
+        dimension, key, count = doc["dimension"], doc["key"], doc["count"]
+        if dimension == "total":
+            result["total"] = count
+        elif count:
+            result[f"by_{dimension}"][key] = count
+    result["by_day"] = dict(sorted(result["by_day"].items()))
+    return result
+
+
+REBUILD_PIPELINE = [
+    {
+        "$facet": {
+            "total": [{"$count": "count"}],
+            "status": [{"$group": {"_id": {"$ifNull": ["$status", "new"]}, "count": {"$sum": 1}}}],
+            "building_type": [
+                {"$group": {"_id": {"$ifNull": ["$building_type", UNSPECIFIED]}, "count": {"$sum": 1}}}
+            ],
+            "day": [
+                {
+                    "$group": {
+                        "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                        "count": {"$sum": 1},
+                    }
+                }
+            ],
+        }
+    }
+]
+
+
+async def rebuild_stats(leads_collection, stats_collection, archive_collection=None) -> int:
+    """Recompute all counters from ``contact_requests`` and the archive; returns the lead total.
+
+    Archived leads stay counted, as they were when archival moved them.
+    Counters incremented by concurrent inserts while the rebuild runs may be
+    overwritten, so run it off-peak.
+    """
+    counts: Counter = Counter()
+    for collection in (leads_collection, archive_collection):
+        if collection is None:
+            continue
+        facets = (await collection.aggregate(REBUILD_PIPELINE).to_list(1))[0]
+        counts[("total", "all")] += facets["total"][0]["count"] if facets["total"] else 0
+        for dimension in ("status", "building_type", "day"):
+            for group in facets[dimension]:
+                counts[(dimension, group["_id"] or UNSPECIFIED)] += group["count"]
+    total = counts[("total", "all")]
+    documents = [
+        {"_id": f"{dimension}:{key}", "dimension": dimension, "key": key, "count": count}
+        for (dimension, key), count in counts.items()
+    ]
+    await stats_collection.delete_many({})
+    await stats_collection.insert_many(documents)
+    return total
+
+
+async def _rebuild_from_env() -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        db = client[os.environ['DB_NAME']]
+        return await rebuild_stats(db.contact_requests, db.lead_stats, db.contact_requests_archive)
+    finally:
+        client.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["rebuild"]:
+        print("usage: python lead_stats.py rebuild", file=sys.stderr)
+        sys.exit(2)
+    total = asyncio.run(_rebuild_from_env())
+    print(f"lead_stats rebuilt from {total} contact requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Lead status workflow with optimistic concurrency.
+
+Allowed transitions: new -> in_progress -> done / rejected, and new -> rejected.
+Every lead carries a ``version`` that each status change increments. A batch
+of changes is validated against one read of the current documents and applied
+as a single unordered ``bulk_write`` whose filters pin the version that was
+read, so a change made concurrently by someone else makes the update miss
+instead of overwriting it. Misses are resolved with one more read and reported
+as conflicts together with the lead's current state.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from lead_stats import record_status_changes
+
+
+LEAD_STATUSES = ("new", "in_progress", "done", "rejected")
+
+STATUS_TRANSITIONS = {
+    "new": {"in_progress", "rejected"},
+    "in_progress": {"done", "rejected"},
+    "done": set(),
+    "rejected": set(),
+}
+
+
+def _version_filter(version: int) -> Any:
+    # Leads stored before versioning have no version field; they count as 0
+    return {"$in": [0, None]} if version == 0 else version
+
+
+def _state(doc: Optional[Dict[str, Any]], lead_id: str) -> Dict[str, Any]:
+    if doc is None:
+        return {"id": lead_id, "status": None, "version": None}
+    return {"id": lead_id, "status": doc.get("status") or "new", "version": doc.get("version") or 0}
+
+
+async def apply_status_changes(
+    collection, stats_collection, changes: List[Tuple[str, str, Optional[int]]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Apply (lead id, new status, expected version or None) changes.
+
+    Returns {"updated": [...], "conflicts": [...]}; updated entries hold the new
+    status and version, conflicts hold a ``reason`` (not_found, duplicate,
+    transition or version) and the lead's current status and version.
+    """
+    ids = [lead_id for lead_id, _, _ in changes]
+    current = {
+        doc["id"]: doc
+        async for doc in collection.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "status": 1, "version": 1})
+    }
+    conflicts: List[Dict[str, Any]] = []
+    planned: List[Tuple[str, str, str, int]] = []
+    seen = set()
+    for lead_id, status, expected_version in changes:
+        doc = current.get(lead_id)
+        state = _state(doc, lead_id)
+        if lead_id in seen:
+            conflicts.append({**state, "reason": "duplicate"})
+            continue
+        seen.add(lead_id)
+        if doc is None:
+            conflicts.append({**state, "reason": "not_found"})
+        elif expected_version is not None and expected_version != state["version"]:
+            conflicts.append({**state, "reason": "version"})
+        elif status not in STATUS_TRANSITIONS.get(state["status"], ()):
+            conflicts.append({**state, "reason": "transition"})
+        else:
+            planned.append((lead_id, state["status"], status, state["version"]))
+
+    if not planned:
+        return {"updated": [], "conflicts": conflicts}
+
+    now = datetime.utcnow()
+    result = await collection.bulk_write(
+        [
+            UpdateOne(
+                {"id": lead_id, "version": _version_filter(version)},
+                {"$set": {"status": new, "status_changed_at": now, "version": version + 1}},
+            )
+            for lead_id, _, new, version in planned
+        ],
+        ordered=False,
+    )
+
+    applied = planned
+    if result.matched_count < len(planned):
+        # Some leads changed between the read and the write; find out which
+        after = {
+            doc["id"]: doc
+            async for doc in collection.find(
+                {"id": {"$in": [p[0] for p in planned]}}, {"_id": 0, "id": 1, "status": 1, "version": 1}
+            )
+        }
+        applied = []
+        for lead_id, old, new, version in planned:
+            doc = after.get(lead_id)
+            if doc is not None and doc.get("version") == version + 1 and doc.get("status") == new:
+                applied.append((lead_id, old, new, version))
+            else:
+                conflicts.append({**_state(doc, lead_id), "reason": "version" if doc else "not_found"})
+
+    if applied:
+        try:
+            await record_status_changes(stats_collection, [(old, new) for _, old, new, _ in applied])
+        except Exception as e:
+            # The statuses are saved; counters can be fixed with a stats rebuild
+            logging.error("Error updating lead stats: %s", e)
+    updated = [{"id": lead_id, "status": new, "version": version + 1} for lead_id, _, new, version in applied]
+    return {"updated": updated, "conflicts": conflicts}
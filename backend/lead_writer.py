@@ -0,0 +1,146 @@
+"""Write-behind batching of contact request inserts.
+
+Documents are accepted into a bounded asyncio queue and a single background
+flusher groups them into ``insert_many`` batches, flushing when a batch is
+full or when the time window since its first document has elapsed.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from mongo_errors import partition_write_errors
+
+
+_STOP = object()
+
+
+class QueueFull(Exception):
+    """Raised when the queue stays full for longer than the put timeout."""
+
+
+class LeadBatchWriter:
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 100,
+        window: float = 0.05,
+        maxsize: int = 10000,
+        put_timeout: float = 1.0,
+        max_attempts: int = 3,
+        after_insert: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+        on_duplicates: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+        on_dropped: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+    ):
+        self.collection = collection
+        self.after_insert = after_insert
+        # Receives documents that could not be inserted after all attempts
+        self.on_dropped = on_dropped
+        self.batch_size = batch_size
+        self.window = window
+        self.put_timeout = put_timeout
+        self.max_attempts = max_attempts
+        # Called with documents rejected by a unique index (already stored, or an identical lead)
+        self.on_duplicates = on_duplicates
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, doc: Dict[str, Any]):
+        """Queue ``doc`` for insertion, waiting up to ``put_timeout`` for space."""
+        if self._closing:
+            raise QueueFull("writer is shutting down")
+        try:
+            self._queue.put_nowait(doc)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(doc), self.put_timeout)
+            except asyncio.TimeoutError:
+                raise QueueFull("contact request queue is full")
+
+    async def close(self):
+        """Stop accepting documents and flush everything already queued."""
+        self._closing = True
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = loop.time() + self.window
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    doc = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        doc = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if doc is _STOP:
+                    stop = True
+                    break
+                batch.append(doc)
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        inserted = await self._insert(batch)
+        if inserted and self.after_insert is not None:
+            try:
+                await self.after_insert(inserted)
+            except Exception as e:
+                logging.error("Error in contact request after-insert hook: %s", e)
+
+    async def _insert(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert ``batch`` with retries; return the documents actually written."""
+        inserted: List[Dict[str, Any]] = []
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                return inserted + batch
+            except BulkWriteError as e:
+                duplicates, failed = partition_write_errors(e)
+                inserted += [doc for i, doc in enumerate(batch) if i not in duplicates and i not in failed]
+                await self._report_duplicates([batch[i] for i in sorted(duplicates)])
+                # Retry only the documents that failed for other reasons
+                batch = [doc for i, doc in enumerate(batch) if i in failed]
+                if not batch:
+                    return inserted
+                logging.error("Error inserting contact request batch (attempt %s): %s", attempt, e)
+            except Exception as e:
+                logging.error("Error inserting contact request batch (attempt %s): %s", attempt, e)
+            await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+        ids = [doc.get("id") for doc in batch]
+        if self.on_dropped is not None:
+            try:
+                await self.on_dropped(batch)
+                return inserted
+            except Exception as e:
+                logging.error("Error in contact request on-dropped hook: %s", e)
+        logging.error("Dropped %s contact requests after %s attempts: %s", len(batch), self.max_attempts, ids)
+        return inserted
+
+    async def _report_duplicates(self, docs: List[Dict[str, Any]]):
+        if not docs or self.on_duplicates is None:
+            return
+        try:
+            await self.on_duplicates(docs)
+        except Exception as e:
+            logging.error("Error handling duplicate contact requests: %s", e)
@@ -0,0 +1,180 @@
+"""In-process request and MongoDB metrics rendered in Prometheus text format.
+
+``MetricsMiddleware`` records per-route request counts and latency histograms;
+``MongoCommandTimer`` is a pymongo command listener that times every command
+by collection and command name. Listener callbacks run on Motor's worker
+threads, so metric updates are guarded by a lock.
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        bucket_names = self.labelnames + ("le",)
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_names, labels + (f'{bound:g}',))} {cumulative:g}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_names, labels + ('+Inf',))} {cumulative:g}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{label_text} {cumulative:g}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route, method and status code.", ("method", "route", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and method.", ("method", "route"),
+))
+mongodb_command_duration_seconds = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command.", ("collection", "command"),
+))
+mongodb_command_failures_total = registry.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection and command.", ("collection", "command"),
+))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request until its last body chunk is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_request_duration_seconds.observe(time.perf_counter() - started, method, path)
+            http_requests_total.inc(method, path, str(status_code))
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Times MongoDB commands; pass an instance to the client's ``event_listeners``."""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[object, int], str] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            # getMore and killCursors carry the collection name under "collection"
+            target = event.command.get("collection", "")
+        if isinstance(target, str) and target:
+            self._collections[(event.connection_id, event.request_id)] = target
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), None)
+        if collection is not None:
+            mongodb_command_duration_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), None)
+        if collection is not None:
+            mongodb_command_duration_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+            mongodb_command_failures_total.inc(collection, event.command_name)
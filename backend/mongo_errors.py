@@ -0,0 +1,16 @@
+"""Helpers for interpreting MongoDB write errors."""
+from typing import Set, Tuple
+
+from pymongo.errors import BulkWriteError
+
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def partition_write_errors(error: BulkWriteError) -> Tuple[Set[int], Set[int]]:
+    """Indexes of the documents an unordered bulk insert rejected: (duplicates, other failures)."""
+    duplicates: Set[int] = set()
+    failed: Set[int] = set()
+    for err in error.details.get("writeErrors", []):
+        (duplicates if err.get("code") == DUPLICATE_KEY_ERROR else failed).add(err["index"])
+    return duplicates, failed
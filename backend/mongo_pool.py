@@ -0,0 +1,119 @@
+"""Env-driven Motor connection pool settings, startup warm-up and pool statistics."""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from pymongo import monitoring
+
+
+def mongo_client_options() -> Dict[str, Any]:
+    """Pool and timeout options for AsyncIOMotorClient, read from the environment."""
+    return {
+        "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '5')),
+        "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+        "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000')),
+        "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+        "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000')),
+    }
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out connections plus the result of the last ping."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.check_out_failures = 0
+        self.pool_clears = 0
+        self.warmed = False
+        self.last_ping_ms: Optional[float] = None
+        self.last_ping_ok = False
+        self.last_ping_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _add(self, attr: str, delta: int):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add("pool_clears", 1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add("open_connections", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("open_connections", -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add("check_out_failures", 1)
+
+    def connection_checked_out(self, event):
+        self._add("checked_out", 1)
+
+    def connection_checked_in(self, event):
+        self._add("checked_out", -1)
+
+    async def ping(self, client, timeout: float = 2.0) -> bool:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(client.admin.command("ping"), timeout)
+        except Exception as e:
+            self.last_ping_ok = False
+            self.last_error = str(e) or type(e).__name__
+        else:
+            self.last_ping_ok = True
+            self.last_error = None
+        self.last_ping_ms = (time.perf_counter() - started) * 1000
+        self.last_ping_at = time.time()
+        return self.last_ping_ok
+
+    async def warm_up(self, client, min_pool_size: int, timeout: float):
+        """Ping the server, then open ``min_pool_size`` connections with concurrent pings."""
+        if not await self.ping(client, timeout=timeout):
+            logging.error("MongoDB warm-up ping failed: %s", self.last_error)
+            return
+        if min_pool_size > 1:
+            # Each in-flight command checks out its own connection
+            await asyncio.gather(
+                *(client.admin.command("ping") for _ in range(min_pool_size)),
+                return_exceptions=True,
+            )
+        self.warmed = True
+        logging.info("MongoDB pool warmed: %s connections, ping %.1f ms", self.open_connections, self.last_ping_ms)
+
+    def snapshot(self, max_pool_size: int) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "warmed": self.warmed,
+                "last_ping_ok": self.last_ping_ok,
+                "last_ping_ms": round(self.last_ping_ms, 3) if self.last_ping_ms is not None else None,
+                "last_ping_at": self.last_ping_at,
+                "last_error": self.last_error,
+                "pool": {
+                    "open_connections": self.open_connections,
+                    "checked_out": self.checked_out,
+                    "max_pool_size": max_pool_size,
+                    "check_out_failures": self.check_out_failures,
+                    "pool_clears": self.pool_clears,
+                },
+            }
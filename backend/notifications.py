@@ -0,0 +1,247 @@
+"""Outbox-based new lead notifications.
+
+The outbox entry is a ``notify`` sub-document on the lead itself, written by
+the same insert as the lead, so a stored lead always has its notification
+and the form pays no extra round trip for it. A pool of background workers
+claims pending leads in batches, delivers them through a sink (SMTP for now)
+and reschedules failures with exponential backoff, so mail server latency or
+downtime never reaches the form request.
+
+For local testing run a debugging SMTP server, e.g.
+``python -m aiosmtpd -n -l localhost:1025``, and set NOTIFY_SMTP_HOST=localhost,
+NOTIFY_SMTP_PORT=1025.
+"""
+import asyncio
+import logging
+import os
+import smtplib
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel
+
+
+# Indexes on contact_requests; sparse, so leads without notifications stay out
+LEAD_NOTIFY_INDEXES = [
+    IndexModel(
+        [("notify.status", ASCENDING), ("notify.next_attempt_at", ASCENDING)],
+        name="notify_status_next_attempt_at",
+        sparse=True,
+    ),
+    IndexModel([("notify.claim", ASCENDING)], name="notify_claim", sparse=True),
+]
+
+# Lead fields passed to the sink as the notification payload
+NOTIFICATION_FIELDS = ("id", "name", "phone", "email", "building_type", "area", "message", "created_at")
+NOTIFY_PROJECTION = {"_id": 0, "notify": 1, **{field: 1 for field in NOTIFICATION_FIELDS}}
+
+
+def pending_notification(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """``notify`` sub-document for a new lead; stored by the lead's own insert."""
+    return {"status": "pending", "attempts": 0, "next_attempt_at": now or datetime.utcnow()}
+
+
+class SmtpSink:
+    """Sends one email per outbox entry, reusing a single SMTP session per batch."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        recipients: List[str],
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+        timeout: float = 10.0,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls) -> Optional["SmtpSink"]:
+        host = os.environ.get('NOTIFY_SMTP_HOST')
+        recipients = [r.strip() for r in os.environ.get('NOTIFY_EMAIL_TO', '').split(',') if r.strip()]
+        if not host or not recipients:
+            return None
+        return cls(
+            host=host,
+            port=int(os.environ.get('NOTIFY_SMTP_PORT', '25')),
+            sender=os.environ.get('NOTIFY_EMAIL_FROM', 'noreply@angastr.ru'),
+            recipients=recipients,
+            username=os.environ.get('NOTIFY_SMTP_USER') or None,
+            password=os.environ.get('NOTIFY_SMTP_PASSWORD') or None,
+            starttls=os.environ.get('NOTIFY_SMTP_STARTTLS', 'false').lower() == 'true',
+        )
+
+    def build_message(self, entry: Dict[str, Any]) -> EmailMessage:
+        lead = entry["payload"]
+        message = EmailMessage()
+        message["Subject"] = f"Новая заявка: {lead.get('name')}, {lead.get('phone')}"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        lines = [
+            f"Имя: {lead.get('name')}",
+            f"Телефон: {lead.get('phone')}",
+            f"Email: {lead.get('email') or '—'}",
+            f"Тип здания: {lead.get('building_type') or '—'}",
+            f"Площадь: {lead.get('area') or '—'}",
+            f"Сообщение: {lead.get('message') or '—'}",
+            "",
+            f"Заявка {lead.get('id')} от {lead.get('created_at')}",
+        ]
+        message.set_content("\n".join(lines))
+        return message
+
+    def _send_batch_sync(self, entries: List[Dict[str, Any]]) -> Dict[str, str]:
+        failures: Dict[str, str] = {}
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            for entry in entries:
+                try:
+                    smtp.send_message(self.build_message(entry))
+                except smtplib.SMTPException as e:
+                    failures[entry["id"]] = str(e)
+        return failures
+
+    async def send_batch(self, entries: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Deliver ``entries``; return {entry id: error} for the ones that failed."""
+        try:
+            return await asyncio.to_thread(self._send_batch_sync, entries)
+        except (OSError, smtplib.SMTPException) as e:
+            # Connection-level failure: the whole batch is retried
+            return {entry["id"]: str(e) for entry in entries}
+
+
+class OutboxWorkerPool:
+    def __init__(
+        self,
+        collection,
+        sink,
+        workers: int = 2,
+        batch_size: int = 20,
+        poll_interval: float = 5.0,
+        max_attempts: int = 8,
+        base_delay: float = 10.0,
+        max_delay: float = 3600.0,
+        lease: float = 120.0,
+    ):
+        self.collection = collection
+        self.sink = sink
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    def notify(self):
+        """Wake idle workers after new entries were recorded."""
+        self._wakeup.set()
+
+    async def close(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+
+    def _backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    async def _claim(self) -> List[Dict[str, Any]]:
+        """Claim due notifications; entries are {id: lead id, attempts, payload}."""
+        now = datetime.utcnow()
+        claimable = {
+            "$or": [
+                {"notify.status": "pending", "notify.next_attempt_at": {"$lte": now}},
+                # Entries of a worker that died mid-delivery become claimable after the lease
+                {"notify.status": "processing", "notify.lease_until": {"$lt": now}},
+            ]
+        }
+        candidates = await self.collection.find(claimable, {"_id": 0, "id": 1}).limit(self.batch_size).to_list(None)
+        if not candidates:
+            return []
+        claim = str(uuid.uuid4())
+        await self.collection.update_many(
+            {"$and": [{"id": {"$in": [c["id"] for c in candidates]}}, claimable]},
+            {
+                "$set": {
+                    "notify.status": "processing",
+                    "notify.claim": claim,
+                    "notify.lease_until": now + timedelta(seconds=self.lease),
+                }
+            },
+        )
+        leads = await self.collection.find({"notify.claim": claim}, NOTIFY_PROJECTION).to_list(None)
+        return [
+            {
+                "id": lead["id"],
+                "attempts": lead["notify"].get("attempts", 0),
+                "payload": {field: lead.get(field) for field in NOTIFICATION_FIELDS},
+            }
+            for lead in leads
+        ]
+
+    async def _deliver(self, batch: List[Dict[str, Any]]):
+        failures = await self.sink.send_batch(batch)
+        now = datetime.utcnow()
+        sent = [entry["id"] for entry in batch if entry["id"] not in failures]
+        if sent:
+            await self.collection.update_many(
+                {"id": {"$in": sent}},
+                {
+                    "$set": {"notify.status": "sent", "notify.sent_at": now},
+                    "$unset": {"notify.claim": "", "notify.lease_until": ""},
+                },
+            )
+        for entry in batch:
+            error = failures.get(entry["id"])
+            if error is None:
+                continue
+            attempts = entry.get("attempts", 0) + 1
+            update = {"notify.attempts": attempts, "notify.last_error": error}
+            if attempts >= self.max_attempts:
+                update["notify.status"] = "failed"
+                logging.error("Lead notification %s failed after %s attempts: %s", entry['id'], attempts, error)
+            else:
+                update["notify.status"] = "pending"
+                update["notify.next_attempt_at"] = now + self._backoff(attempts)
+            await self.collection.update_one(
+                {"id": entry["id"]}, {"$set": update, "$unset": {"notify.claim": "", "notify.lease_until": ""}}
+            )
+
+    async def _run(self):
+        while not self._stopping:
+            # Cleared before claiming so a notify() during the claim is not lost
+            self._wakeup.clear()
+            try:
+                batch = await self._claim()
+                if batch:
+                    await self._deliver(batch)
+                    continue
+            except Exception as e:
+                logging.error("Error processing lead notifications: %s", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,144 @@
+"""In-process token-bucket rate limiting keyed by client IP and route prefix.
+
+Buckets are spread over a fixed number of dict shards. Each check is O(1);
+idle buckets are evicted incrementally, one shard per sweep, so no single
+request pays for scanning every bucket.
+"""
+import json
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class RateLimit(NamedTuple):
+    capacity: float
+    refill_per_second: float
+
+
+def parse_rate_limits(spec: str) -> List[Tuple[str, RateLimit]]:
+    """Parse ``"/api/contact-form=5/60,/api/admin=120/60"`` (requests per seconds).
+
+    Returns (path prefix, limit) pairs, longest prefix first.
+    """
+    limits = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        prefix, rate = item.split("=", 1)
+        requests, seconds = rate.split("/", 1)
+        limits.append((prefix.strip(), RateLimit(float(requests), float(requests) / float(seconds))))
+    return sorted(limits, key=lambda pair: len(pair[0]), reverse=True)
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class ShardedTokenBucketLimiter:
+    def __init__(
+        self,
+        limits: List[Tuple[str, RateLimit]],
+        shards: int = 16,
+        idle_ttl: float = 300.0,
+        sweep_interval: float = 10.0,
+    ):
+        self.limits = limits
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._shards: List[Dict[Tuple[str, str], _Bucket]] = [{} for _ in range(shards)]
+        self._next_shard = 0
+        self._last_sweep = time.monotonic()
+
+    def limit_for(self, path: str) -> Optional[Tuple[str, RateLimit]]:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return prefix, limit
+        return None
+
+    def check(self, client: str, prefix: str, limit: RateLimit, now: Optional[float] = None) -> float:
+        """Take one token; return 0 if allowed, else seconds until a token is available."""
+        if now is None:
+            now = time.monotonic()
+        key = (client, prefix)
+        shard = self._shards[hash(key) % len(self._shards)]
+        bucket = shard.get(key)
+        if bucket is None:
+            bucket = shard[key] = _Bucket(limit.capacity, now)
+        else:
+            bucket.tokens = min(limit.capacity, bucket.tokens + (now - bucket.updated) * limit.refill_per_second)
+            bucket.updated = now
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / limit.refill_per_second
+
+    def _sweep(self, now: float):
+        shard = self._shards[self._next_shard]
+        self._next_shard = (self._next_shard + 1) % len(self._shards)
+        self._last_sweep = now
+        idle = [key for key, bucket in shard.items() if now - bucket.updated > self.idle_ttl]
+        for key in idle:
+            del shard[key]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 before routing, validation or database work.
+
+    With ``trust_proxy``, the client address is read from ``X-Forwarded-For``:
+    the entry ``proxy_hops`` from the right, i.e. the one appended by the
+    outermost of our own proxies. Entries to the left of it are supplied by
+    the client and are ignored.
+    """
+
+    def __init__(self, app, limiter: ShardedTokenBucketLimiter, trust_proxy: bool = False, proxy_hops: int = 1):
+        self.app = app
+        self.limiter = limiter
+        self.trust_proxy = trust_proxy
+        self.proxy_hops = proxy_hops
+
+    def client_ip(self, scope) -> str:
+        if self.trust_proxy:
+            forwarded: List[str] = []
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    forwarded += [entry.strip() for entry in value.decode("latin-1").split(",")]
+            if len(forwarded) >= self.proxy_hops and forwarded[-self.proxy_hops]:
+                return forwarded[-self.proxy_hops]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        match = self.limiter.limit_for(scope["path"])
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+        prefix, limit = match
+        retry_after = self.limiter.check(self.client_ip(scope), prefix, limit)
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+        body = json.dumps(
+            {"detail": "Слишком много запросов, повторите попытку позже"}, ensure_ascii=False
+        ).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, round(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,28 +1,57 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 import logging
-import re
 from pathlib import Path
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from pymongo.errors import DuplicateKeyError
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from typing import Dict, List, Optional
+from typing_extensions import NotRequired, TypedDict
 import uuid
 from datetime import datetime
 
+from compression import CompressionMiddleware
+from content_cache import ContentCache
+from content_store import ContentStore
+from db_indexes import ensure_indexes
+from dedupe import DuplicateDetector, dedupe_key, lead_content_hash
+from estimate import FRAMES, INSULATIONS, EstimateEngine, UnknownBuildingType
+from idempotency import IdempotencyInProgress, IdempotencyKeyReused, IdempotencyStore, request_fingerprint
+from lead_archive import LeadArchiver
+from lead_events import LeadBroadcastHub
+from lead_export import EXPORT_PROJECTION, export_csv, export_ndjson
+from lead_import import LeadImporter, iter_csv_rows, iter_line_blocks, iter_ndjson_rows
+from lead_queries import (
+    ADMIN_LIST_FIELDS,
+    ADMIN_LIST_PROJECTION,
+    LEAD_SORT,
+    InvalidCursor,
+    apply_cursor,
+    build_lead_filter,
+    encode_cursor,
+    text_search,
+)
+from lead_stats import LeadStatsRecorder, read_stats, rebuild_stats
+from lead_spool import UNAVAILABLE_ERRORS, CircuitBreaker, LeadSpool
+from lead_status import LEAD_STATUSES, apply_status_changes
+from lead_writer import LeadBatchWriter, QueueFull
+from metrics import MetricsMiddleware, MongoCommandTimer, registry as metrics_registry
+from mongo_pool import PoolStats
+from notifications import OutboxWorkerPool, SmtpSink, pending_notification
+from rate_limit import RateLimitMiddleware, ShardedTokenBucketLimiter, parse_rate_limits
+from settings import Settings
+from structured_logging import RequestLogMiddleware, configure_logging
+from validation import canonical_phone, is_valid_email, normalize_email, parse_area_sqm
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Create the main app without a prefix
-app = FastAPI(title="Ангастр API", description="API для строительной компании ООО Ангастр")
-
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -36,39 +65,143 @@ class ContactRequestCreate(BaseModel):
     area: Optional[str] = Field(default=None, description="Площадь в м²")
     message: Optional[str] = Field(default=None, max_length=1000, description="Дополнительное сообщение")
 
-    @validator('phone')
+    @field_validator('phone')
+    @classmethod
     def validate_phone(cls, v):
-        # Российский формат: +7 (XXX) XXX-XX-XX или +7XXXXXXXXXX
-        phone_pattern = r'^(\+7|8)?[\s\-]?\(?\d{3}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}$'
-        if not re.match(phone_pattern, v.replace(' ', '').replace('-', '').replace('(', '').replace(')', '')):
+        if canonical_phone(v) is None:
             raise ValueError('Неверный формат телефона')
         return v
 
-    @validator('email')
+    @field_validator('email')
+    @classmethod
     def validate_email(cls, v):
-        if v is not None and v.strip():
-            email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if not re.match(email_pattern, v):
-                raise ValueError('Неверный формат email')
+        if v is not None and v.strip() and not is_valid_email(v):
+            raise ValueError('Неверный формат email')
         return v
 
 class ContactRequest(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     phone: str
+    phone_e164: Optional[str] = None
     email: Optional[str] = None
+    email_normalized: Optional[str] = None
     building_type: Optional[str] = None
     area: Optional[str] = None
+    area_sqm: Optional[float] = None
     message: Optional[str] = None
+    content_hash: Optional[str] = None
+    dedupe_key: Optional[str] = None
     status: str = "new"
+    version: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ArchivedContactRequest(BaseModel):
+    id: str
+    name: str
+    phone: str
+    email: Optional[str] = None
+    building_type: Optional[str] = None
+    area: Optional[str] = None
+    area_sqm: Optional[float] = None
+    message: Optional[str] = None
+    status: str = "new"
+    status_changed_at: Optional[datetime] = None
+    created_at: datetime
+    archived_at: datetime
+
+class ContactRequestListItem(TypedDict):
+    """Admin list row, serialized straight from the projected Mongo document"""
+    id: str
+    name: str
+    phone: str
+    email: NotRequired[Optional[str]]
+    building_type: NotRequired[Optional[str]]
+    area: NotRequired[Optional[str]]
+    area_sqm: NotRequired[Optional[float]]
+    message: NotRequired[Optional[str]]
+    status: NotRequired[str]
+    version: NotRequired[int]
+    status_changed_at: NotRequired[Optional[datetime]]
+    created_at: datetime
+
+# Built once at import; dump_json skips model construction and FastAPI's response validation
+CONTACT_REQUEST_LIST = TypeAdapter(List[ContactRequestListItem])
+
+class ContactRequestSearchHit(BaseModel):
+    id: str
+    name: str
+    phone: str
+    email: Optional[str] = None
+    building_type: Optional[str] = None
+    area: Optional[str] = None
+    area_sqm: Optional[float] = None
+    status: str
+    version: int = 0
+    created_at: datetime
+    score: float
+
 class ContactResponse(BaseModel):
     success: bool
     message: str
     request_id: str
     estimated_callback_time: str
 
+STATUS_PATTERN = "^(" + "|".join(LEAD_STATUSES) + ")$"
+
+class StatusChange(BaseModel):
+    status: str = Field(..., pattern=STATUS_PATTERN)
+    version: Optional[int] = Field(None, ge=0, description="Ожидаемая версия заявки")
+
+class BulkStatusItem(StatusChange):
+    id: str
+
+class BulkStatusChange(BaseModel):
+    updates: List[BulkStatusItem] = Field(..., min_length=1, max_length=1000)
+
+class LeadStatusState(BaseModel):
+    id: str
+    status: str
+    version: int
+
+class StatusConflict(BaseModel):
+    id: str
+    reason: str
+    status: Optional[str] = None
+    version: Optional[int] = None
+
+class BulkStatusResult(BaseModel):
+    updated: List[LeadStatusState]
+    conflicts: List[StatusConflict]
+
+class Estimate(BaseModel):
+    building_type: str
+    area_sqm: float
+    frame: str
+    insulation: str
+    price_per_sqm_min: int
+    price_per_sqm_max: int
+    price_min: int
+    price_max: int
+    currency: str
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportReport(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+
+class LeadStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_building_type: Dict[str, int]
+    by_day: Dict[str, int]
+
 class CompanyInfo(BaseModel):
     name: str = "ООО «Ангастр»"
     tagline: str = "Строительство каркасных ангаров под ключ"
@@ -84,6 +217,10 @@ class Service(BaseModel):
     category: str
     items: List[str]
 
+class ServiceData(BaseModel):
+    category: str = Field(..., min_length=1, max_length=200)
+    items: List[str]
+
 class Project(BaseModel):
     id: int
     title: str
@@ -92,8 +229,21 @@ class Project(BaseModel):
     duration: str
     type: str
 
+class ProjectData(BaseModel):
+    title: str = Field(..., min_length=1, max_length=200)
+    description: str = Field(..., max_length=2000)
+    area: str = Field(..., max_length=100)
+    duration: str = Field(..., max_length=100)
+    type: str = Field(..., max_length=200)
+
+
+# Site content
+# Services and projects live in Mongo and are edited through the admin API;
+# SERVICES_DATA and PROJECTS_DATA seed empty collections. Bump CONTENT_VERSION
+# whenever CompanyInfo changes so the pre-serialized response cache (and
+# client ETags) are rebuilt.
+CONTENT_VERSION = "1"
 
-# Static data
 SERVICES_DATA = [
     {
         "id": 1,
@@ -173,88 +323,826 @@ PROJECTS_DATA = [
 ]
 
 
+# Pre-serialized content cache
+def serialize(model_type, data) -> bytes:
+    adapter = TypeAdapter(model_type)
+    return adapter.dump_json(adapter.validate_python(data))
+
+DEFAULT_CONTENT = {"services": SERVICES_DATA, "projects": PROJECTS_DATA}
+
+def build_content_payloads(catalogs):
+    return {
+        "company-info": CompanyInfo().model_dump_json().encode(),
+        "services": serialize(List[Service], catalogs["services"]),
+        "projects": serialize(List[Project], catalogs["projects"]),
+    }
+
+
+def build_contact_request(request: ContactRequestCreate, dedupe_window_seconds: int = 0) -> ContactRequest:
+    """Создание заявки из валидированной формы с каноническими телефоном и email"""
+    phone_e164 = canonical_phone(request.phone)
+    email_normalized = normalize_email(request.email)
+    created_at = datetime.utcnow()
+    content_hash = lead_content_hash(
+        phone_e164, request.name, email_normalized, request.building_type, request.area, request.message
+    )
+    return ContactRequest(
+        name=request.name,
+        phone=request.phone,
+        phone_e164=phone_e164,
+        email=request.email,
+        email_normalized=email_normalized,
+        building_type=request.building_type,
+        area=request.area,
+        area_sqm=parse_area_sqm(request.area),
+        message=request.message,
+        content_hash=content_hash,
+        dedupe_key=dedupe_key(content_hash, created_at, dedupe_window_seconds) if dedupe_window_seconds else None,
+        created_at=created_at,
+    )
+
+def contact_response(request_id: str) -> ContactResponse:
+    return ContactResponse(
+        success=True,
+        message="Заявка успешно отправлена! Мы свяжемся с вами в ближайшее время.",
+        request_id=request_id,
+        estimated_callback_time="30 минут"
+    )
+
+
+# Seconds between index/seed attempts when Mongo was unavailable at startup
+BOOTSTRAP_RETRY_INTERVAL = 5.0
+
+
+class AppContext:
+    """MongoDB client and the components built on it, owned by one app instance.
+
+    The client is only created in ``start`` (run by the app lifespan), so
+    importing the module or building the app never opens connections, and a
+    pre-fork server creates one client per worker process.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.pool_stats = PoolStats()
+        self.content_cache = ContentCache(
+            max_age=settings.content_cache_max_age,
+            min_compress_size=settings.compression_min_size,
+        )
+        self.estimates = EstimateEngine(cache_size=settings.estimate_cache_size)
+        # Live feed of new leads for the admin panel (Server-Sent Events)
+        self.lead_events = LeadBroadcastHub(
+            queue_size=settings.lead_events_queue_size,
+            heartbeat=settings.lead_events_heartbeat,
+        )
+        # Consecutive contact form write failures; while open, leads go to lead_spool
+        self.mongo_breaker = CircuitBreaker(
+            failure_threshold=settings.mongo_breaker_threshold,
+            reset_timeout=settings.mongo_breaker_reset,
+        )
+        # Set once ensure_indexes succeeded; the spool replay relies on the unique indexes
+        self.indexes_ready = asyncio.Event()
+        self._bootstrap_task = None
+        self.client = None
+        self.db = None
+        self.content_store = None
+        self.lead_stats = None
+        self.lead_writer = None
+        self.lead_spool = None
+        self.outbox_workers = None
+        self.duplicate_detector = None
+        self.idempotency = None
+        self.archiver = None
+
+    def open(self):
+        settings = self.settings
+        self.client = AsyncIOMotorClient(
+            settings.mongo_url,
+            event_listeners=[MongoCommandTimer(), self.pool_stats],
+            **settings.mongo_options,
+        )
+        db = self.db = self.client[settings.db_name]
+        self.content_store = ContentStore(
+            db,
+            self.content_cache,
+            build_content_payloads,
+            version_prefix=CONTENT_VERSION,
+            poll_interval=settings.content_reload_interval,
+        )
+
+        self.lead_stats = LeadStatsRecorder(db.lead_stats, interval=settings.stats_flush_interval)
+
+        # New lead notifications via the leads' notify outbox field; enabled when SMTP is configured
+        notification_sink = SmtpSink.from_env()
+        if notification_sink is not None:
+            self.outbox_workers = OutboxWorkerPool(
+                db.contact_requests,
+                notification_sink,
+                workers=settings.notify_workers,
+                batch_size=settings.notify_batch_size,
+                max_attempts=settings.notify_max_attempts,
+            )
+
+        # Leads accepted while Mongo is down are journaled locally and replayed later
+        if settings.lead_spool_path:
+            self.lead_spool = LeadSpool(
+                settings.lead_spool_path,
+                db.contact_requests,
+                self.mongo_breaker,
+                batch_size=settings.lead_spool_batch_size,
+                interval=settings.lead_spool_replay_interval,
+                after_insert=self.on_leads_inserted,
+                ready=self.indexes_ready,
+            )
+
+        # Optional write-behind batching of contact form inserts
+        if settings.write_behind:
+            self.lead_writer = LeadBatchWriter(
+                db.contact_requests,
+                batch_size=settings.contact_batch_size,
+                window=settings.contact_batch_window,
+                maxsize=settings.contact_queue_size,
+                put_timeout=settings.contact_queue_put_timeout,
+                after_insert=self.on_leads_inserted,
+                on_duplicates=self.resolve_duplicate_leads,
+                on_dropped=self.lead_spool.append_many if self.lead_spool is not None else None,
+            )
+
+        if settings.archive_after_days:
+            self.archiver = LeadArchiver(
+                db.contact_requests,
+                db.contact_requests_archive,
+                max_age_days=settings.archive_after_days,
+                batch_size=settings.archive_batch_size,
+                max_batches=settings.archive_max_batches,
+                pause=settings.archive_pause,
+                interval=settings.archive_interval,
+            )
+
+        # Idempotency-Key replay for the contact form; IDEMPOTENCY_TTL_SECONDS=0 disables it
+        if settings.idempotency_ttl_seconds:
+            self.idempotency = IdempotencyStore(
+                db.idempotency_keys,
+                ttl_seconds=settings.idempotency_ttl_seconds,
+                cache_size=settings.idempotency_cache_size,
+            )
+
+        if settings.dedupe_window_seconds:
+            self.duplicate_detector = DuplicateDetector(
+                db.contact_requests,
+                window_seconds=settings.dedupe_window_seconds,
+                cache_size=settings.dedupe_cache_size,
+            )
+
+    async def start(self):
+        self.open()
+        # Serve the seed data if Mongo is unavailable; the poller catches up later
+        self.content_store.use_defaults(DEFAULT_CONTENT)
+        mongo_options = self.settings.mongo_options
+        await self.pool_stats.warm_up(
+            self.client,
+            mongo_options["minPoolSize"],
+            timeout=mongo_options["serverSelectionTimeoutMS"] / 1000 + 1,
+        )
+        # With Mongo down, start serving now and create indexes and seed data once it is back
+        if not (self.pool_stats.warmed and await self.bootstrap()):
+            self._bootstrap_task = asyncio.create_task(self._bootstrap_until_done())
+        self.content_store.start()
+        self.lead_stats.start()
+        if self.lead_spool is not None:
+            self.lead_spool.start()
+        if self.lead_writer is not None:
+            self.lead_writer.start()
+        if self.outbox_workers is not None:
+            self.outbox_workers.start()
+        if self.archiver is not None:
+            self.archiver.start()
+
+    async def close(self):
+        if self._bootstrap_task is not None:
+            self._bootstrap_task.cancel()
+            await asyncio.gather(self._bootstrap_task, return_exceptions=True)
+            self._bootstrap_task = None
+        if self.archiver is not None:
+            await self.archiver.close()
+        if self.lead_writer is not None:
+            await self.lead_writer.close()
+        if self.lead_spool is not None:
+            await self.lead_spool.close()
+        if self.outbox_workers is not None:
+            await self.outbox_workers.close()
+        if self.lead_stats is not None:
+            # After the writers, so their last leads are counted
+            await self.lead_stats.close()
+        if self.content_store is not None:
+            await self.content_store.close()
+        if self.client is not None:
+            self.client.close()
+
+    async def bootstrap(self) -> bool:
+        """Создание индексов и начальных данных сайта; True, когда все готово"""
+        if not self.indexes_ready.is_set():
+            if not await ensure_indexes(self.db):
+                return False
+            self.indexes_ready.set()
+        try:
+            await self.content_store.seed(DEFAULT_CONTENT)
+            await self.content_store.refresh()
+        except Exception as e:
+            logging.error("Error loading site content: %s", e)
+            return False
+        return True
+
+    async def _bootstrap_until_done(self):
+        while not await self.bootstrap():
+            await asyncio.sleep(BOOTSTRAP_RETRY_INTERVAL)
+        logging.info("MongoDB indexes and site content initialized")
+
+    async def mongo_call(self, operation):
+        """Вызов MongoDB для контактной формы через circuit breaker (при включенном спуле)"""
+        if self.lead_spool is None:
+            return await operation
+        return await self.mongo_breaker.call(operation, self.settings.contact_write_timeout)
+
+    async def on_leads_inserted(self, leads):
+        """Учет заявок в статистике (запись — в фоне) и пробуждение воркеров уведомлений"""
+        self.lead_stats.add_inserts(leads)
+        if self.outbox_workers is not None:
+            self.outbox_workers.notify()
+
+    async def resolve_duplicate_leads(self, docs):
+        """Handle queued leads the write-behind insert rejected as duplicates.
+
+        The caller was already answered with the lead's id; when an identical lead
+        from another worker holds the ``dedupe_key``, later retries are pointed at
+        that lead instead.
+        """
+        for doc in docs:
+            if self.duplicate_detector is None or not doc.get("dedupe_key"):
+                continue
+            original_id = await self.duplicate_detector.resolve_conflict(
+                doc["phone_e164"], doc["content_hash"], doc["dedupe_key"]
+            )
+            if original_id != doc["id"]:
+                logging.warning("Dropped contact request identical to %s: %s", original_id, doc)
+
+def get_context(request: Request) -> AppContext:
+    return request.app.state.context
+
+
 # API Routes
 @api_router.get("/", tags=["Health"])
 async def root():
     return {"message": "Ангастр API v1.0", "status": "active"}
 
+@api_router.get("/ready", tags=["Health"])
+async def readiness(ctx: AppContext = Depends(get_context)):
+    """Проверка готовности: пул соединений прогрет и MongoDB отвечает на ping (или заявки пишутся в спул)"""
+    if ctx.pool_stats.warmed:
+        await ctx.pool_stats.ping(ctx.client)
+    else:
+        # Startup warm-up failed (e.g. Mongo was down during deploy); retry it here
+        await ctx.pool_stats.warm_up(ctx.client, ctx.settings.mongo_options["minPoolSize"], timeout=2.0)
+    body = ctx.pool_stats.snapshot(ctx.settings.mongo_options["maxPoolSize"])
+    ready = ctx.pool_stats.warmed and ctx.pool_stats.last_ping_ok
+    if ctx.lead_spool is not None:
+        # Without Mongo the worker still accepts leads into the spool: degraded, not down
+        body["mongo_circuit"] = ctx.mongo_breaker.state
+        body["spooled_leads_pending"] = ctx.lead_spool.pending()
+        body["degraded"] = not ready
+        ready = ready or ctx.lead_spool.writable()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, **body})
+
+@api_router.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def get_metrics():
+    """Метрики запросов и операций MongoDB в формате Prometheus"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @api_router.post("/contact-form", response_model=ContactResponse, tags=["Contact"])
-async def submit_contact_form(request: ContactRequestCreate):
-    """Обработка контактной формы"""
+async def submit_contact_form(
+    request: ContactRequestCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
+    ctx: AppContext = Depends(get_context),
+):
+    """Обработка контактной формы.
+
+    Повтор запроса с тем же заголовком Idempotency-Key возвращает сохраненный ответ.
+    """
+    # The key store lives in Mongo: while it is down, rely on duplicate detection instead
+    if idempotency_key is None or ctx.idempotency is None or ctx.mongo_breaker.state != "closed":
+        return await save_contact_request(request, ctx)
+
+    async def handler():
+        return (await save_contact_request(request, ctx)).model_dump()
+
     try:
-        # Create contact request
-        contact_request = ContactRequest(
-            name=request.name,
-            phone=request.phone,
-            email=request.email,
-            building_type=request.building_type,
-            area=request.area,
-            message=request.message
+        stored, replayed = await ctx.idempotency.run(
+            idempotency_key, request_fingerprint(request.model_dump_json().encode()), handler
         )
-        
-        # Save to database
-        result = await db.contact_requests.insert_one(contact_request.dict())
-        
-        if result.inserted_id:
-            return ContactResponse(
-                success=True,
-                message="Заявка успешно отправлена! Мы свяжемся с вами в ближайшее время.",
-                request_id=contact_request.id,
-                estimated_callback_time="30 минут"
+    except IdempotencyKeyReused:
+        raise HTTPException(status_code=422, detail="Ключ Idempotency-Key уже использован для другой заявки")
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=409,
+            detail="Заявка с этим ключом еще обрабатывается",
+            headers={"Retry-After": "1"},
+        )
+    except UNAVAILABLE_ERRORS as e:
+        if ctx.lead_spool is None:
+            raise
+        ctx.mongo_breaker.record_failure()
+        logging.error("Idempotency store unavailable: %s", e)
+        return await save_contact_request(request, ctx)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return stored
+
+async def save_contact_request(request: ContactRequestCreate, ctx: AppContext) -> ContactResponse:
+    try:
+        # Create contact request
+        contact_request = build_contact_request(request, ctx.settings.dedupe_window_seconds)
+        document = contact_request.model_dump()
+        if ctx.outbox_workers is not None:
+            # The notification outbox entry is stored by the lead's own insert
+            document["notify"] = pending_notification(contact_request.created_at)
+        # While Mongo is known to be down the lead goes straight to the local spool
+        use_mongo = ctx.lead_spool is None or ctx.mongo_breaker.allow()
+        spooled = False
+
+        # Repeated submissions (double clicks, retries) get the original request id
+        if ctx.duplicate_detector is not None:
+            phone, content_hash = contact_request.phone_e164, contact_request.content_hash
+            lookup = ctx.duplicate_detector.find_original(phone, content_hash, cached_only=not use_mongo)
+            try:
+                original_id = await (ctx.mongo_call(lookup) if use_mongo else lookup)
+            except UNAVAILABLE_ERRORS as e:
+                if ctx.lead_spool is None:
+                    raise
+                logging.error("Duplicate lookup failed, spooling contact request: %s", e)
+                use_mongo, original_id = False, None
+            if original_id is None:
+                original_id = ctx.duplicate_detector.claim(phone, content_hash, contact_request.id)
+            if original_id is not None:
+                return contact_response(original_id)
+
+        # Save to database (or hand off to the write-behind queue or the local spool)
+        try:
+            if not use_mongo:
+                spooled = True
+            elif ctx.lead_writer is not None:
+                await ctx.lead_writer.submit(document)
+                inserted = True
+            else:
+                try:
+                    result = await ctx.mongo_call(ctx.db.contact_requests.insert_one(document))
+                    inserted = bool(result.inserted_id)
+                except UNAVAILABLE_ERRORS as e:
+                    if ctx.lead_spool is None:
+                        raise
+                    # The insert may still land; the replay then skips it by id
+                    logging.error("Error saving contact request, spooling it: %s", e)
+                    spooled = True
+            if spooled:
+                await ctx.lead_spool.append(document)
+                inserted = True
+        except DuplicateKeyError:
+            # An identical submission on another worker won the dedupe_key race
+            if ctx.duplicate_detector is None:
+                raise
+            original_id = await ctx.duplicate_detector.resolve_conflict(
+                contact_request.phone_e164, contact_request.content_hash, contact_request.dedupe_key
             )
+            if original_id is None:
+                raise
+            return contact_response(original_id)
+        except Exception:
+            if ctx.duplicate_detector is not None:
+                ctx.duplicate_detector.forget(contact_request.phone_e164, contact_request.content_hash)
+            raise
+
+        if inserted:
+            ctx.lead_events.publish(contact_request.model_dump(include=set(ADMIN_LIST_FIELDS)))
+            # Spooled leads get stats and notifications when they are replayed
+            if ctx.lead_writer is None and not spooled:
+                try:
+                    await ctx.on_leads_inserted([document])
+                except Exception as e:
+                    # The lead is saved; a lost notification must not fail the form
+                    logging.error("Error recording lead notification: %s", e)
+            return contact_response(contact_request.id)
         else:
             raise HTTPException(status_code=500, detail="Ошибка сохранения заявки")
             
+    except QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Сервис перегружен, повторите попытку позже",
+            headers={"Retry-After": "1"},
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail={"success": False, "message": str(e)})
+    except HTTPException:
+        raise
     except Exception as e:
-        logging.error(f"Error submitting contact form: {e}")
+        logging.error("Error submitting contact form: %s", e)
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
 
 @api_router.get("/company-info", response_model=CompanyInfo, tags=["Company"])
-async def get_company_info():
+async def get_company_info(request: Request, ctx: AppContext = Depends(get_context)):
     """Получение информации о компании"""
-    return CompanyInfo()
+    return ctx.content_cache.response("company-info", request)
 
 @api_router.get("/services", response_model=List[Service], tags=["Services"])
-async def get_services():
+async def get_services(request: Request, ctx: AppContext = Depends(get_context)):
     """Получение списка услуг"""
-    return SERVICES_DATA
+    return ctx.content_cache.response("services", request)
 
 @api_router.get("/projects", response_model=List[Project], tags=["Projects"])
-async def get_projects():
+async def get_projects(request: Request, ctx: AppContext = Depends(get_context)):
     """Получение списка проектов"""
-    return PROJECTS_DATA
+    return ctx.content_cache.response("projects", request)
+
+@api_router.get("/estimate", response_model=Estimate, tags=["Estimate"])
+async def get_estimate(
+    building_type: str = Query(..., max_length=200, description="Тип здания из списка услуг"),
+    area: float = Query(..., ge=10, le=100000, description="Площадь в м²"),
+    frame: str = Query("straight", pattern="^(" + "|".join(FRAMES) + ")$"),
+    insulation: str = Query("cold", pattern="^(" + "|".join(INSULATIONS) + ")$"),
+    ctx: AppContext = Depends(get_context),
+):
+    """Предварительная оценка стоимости ангара (арочный/прямостенный, холодный/утепленный)"""
+    ctx.estimates.ensure(ctx.content_cache.version, ctx.content_store.catalogs["services"])
+    try:
+        return ctx.estimates.estimate(building_type, area, frame, insulation)
+    except UnknownBuildingType:
+        raise HTTPException(status_code=400, detail="Неизвестный тип здания")
 
-@api_router.get("/admin/contact-requests", response_model=List[ContactRequest], tags=["Admin"])
-async def get_contact_requests():
-    """Получение всех заявок (админ панель)"""
+@api_router.post("/admin/services", response_model=Service, tags=["Admin"])
+async def create_service(service: ServiceData, ctx: AppContext = Depends(get_context)):
+    """Добавление услуги"""
     try:
-        requests = await db.contact_requests.find().sort("created_at", -1).to_list(100)
-        return [ContactRequest(**req) for req in requests]
+        return await ctx.content_store.create("services", service.model_dump())
     except Exception as e:
-        logging.error(f"Error fetching contact requests: {e}")
+        logging.error("Error creating service: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка сохранения услуги")
+
+@api_router.put("/admin/services/{service_id}", response_model=Service, tags=["Admin"])
+async def update_service(service_id: int, service: ServiceData, ctx: AppContext = Depends(get_context)):
+    """Изменение услуги"""
+    try:
+        updated = await ctx.content_store.replace("services", service_id, service.model_dump())
+    except Exception as e:
+        logging.error("Error updating service: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка сохранения услуги")
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Услуга не найдена")
+    return updated
+
+@api_router.delete("/admin/services/{service_id}", tags=["Admin"])
+async def delete_service(service_id: int, ctx: AppContext = Depends(get_context)):
+    """Удаление услуги"""
+    try:
+        deleted = await ctx.content_store.delete("services", service_id)
+    except Exception as e:
+        logging.error("Error deleting service: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка удаления услуги")
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Услуга не найдена")
+    return {"success": True}
+
+@api_router.post("/admin/projects", response_model=Project, tags=["Admin"])
+async def create_project(project: ProjectData, ctx: AppContext = Depends(get_context)):
+    """Добавление проекта"""
+    try:
+        return await ctx.content_store.create("projects", project.model_dump())
+    except Exception as e:
+        logging.error("Error creating project: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка сохранения проекта")
+
+@api_router.put("/admin/projects/{project_id}", response_model=Project, tags=["Admin"])
+async def update_project(project_id: int, project: ProjectData, ctx: AppContext = Depends(get_context)):
+    """Изменение проекта"""
+    try:
+        updated = await ctx.content_store.replace("projects", project_id, project.model_dump())
+    except Exception as e:
+        logging.error("Error updating project: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка сохранения проекта")
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Проект не найден")
+    return updated
+
+@api_router.delete("/admin/projects/{project_id}", tags=["Admin"])
+async def delete_project(project_id: int, ctx: AppContext = Depends(get_context)):
+    """Удаление проекта"""
+    try:
+        deleted = await ctx.content_store.delete("projects", project_id)
+    except Exception as e:
+        logging.error("Error deleting project: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка удаления проекта")
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Проект не найден")
+    return {"success": True}
+
+@api_router.get("/admin/contact-requests", response_model=List[ContactRequestListItem], tags=["Admin"])
+async def get_contact_requests(
+    status: Optional[str] = None,
+    building_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    area_min: Optional[float] = Query(None, ge=0),
+    area_max: Optional[float] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    ctx: AppContext = Depends(get_context),
+):
+    """Получение заявок (админ панель) с фильтрами и курсорной пагинацией.
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    """
+    try:
+        query = apply_cursor(build_lead_filter(status, building_type, created_from, created_to, area_min, area_max), cursor)
+        requests = await ctx.db.contact_requests.find(query, ADMIN_LIST_PROJECTION).sort(LEAD_SORT).to_list(limit + 1)
+        headers = {}
+        if len(requests) > limit:
+            requests = requests[:limit]
+            last = requests[-1]
+            headers["X-Next-Cursor"] = encode_cursor(last["created_at"], last["id"])
+        return Response(CONTACT_REQUEST_LIST.dump_json(requests), media_type="application/json", headers=headers)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error("Error fetching contact requests: %s", e)
         raise HTTPException(status_code=500, detail="Ошибка получения заявок")
 
+@api_router.patch("/admin/contact-requests", response_model=BulkStatusResult, tags=["Admin"])
+async def update_contact_request_statuses(body: BulkStatusChange, ctx: AppContext = Depends(get_context)):
+    """Массовая смена статусов заявок (одним bulk_write, с проверкой версий)"""
+    changes = [(item.id, item.status, item.version) for item in body.updates]
+    try:
+        return await apply_status_changes(ctx.db.contact_requests, ctx.db.lead_stats, changes)
+    except Exception as e:
+        logging.error("Error updating contact request statuses: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка изменения статусов")
 
-# Include the router in the main app
-app.include_router(api_router)
+@api_router.patch("/admin/contact-requests/{request_id}", response_model=LeadStatusState, tags=["Admin"])
+async def update_contact_request_status(
+    request_id: str, body: StatusChange, ctx: AppContext = Depends(get_context)
+):
+    """Смена статуса заявки: new → in_progress → done/rejected"""
+    try:
+        result = await apply_status_changes(
+            ctx.db.contact_requests, ctx.db.lead_stats, [(request_id, body.status, body.version)]
+        )
+    except Exception as e:
+        logging.error("Error updating contact request status: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка изменения статуса")
+    if result["updated"]:
+        return result["updated"][0]
+    conflict = result["conflicts"][0]
+    if conflict["reason"] == "not_found":
+        raise HTTPException(status_code=404, detail="Заявка не найдена")
+    if conflict["reason"] == "transition":
+        raise HTTPException(
+            status_code=400, detail=f"Недопустимый переход статуса: {conflict['status']} → {body.status}"
+        )
+    raise HTTPException(status_code=409, detail=conflict)
+
+@api_router.get("/admin/contact-requests/stream", tags=["Admin"])
+async def stream_contact_requests(ctx: AppContext = Depends(get_context)):
+    """Поток новых заявок в реальном времени (Server-Sent Events)"""
+    return StreamingResponse(
+        ctx.lead_events.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@api_router.get("/admin/contact-requests/search", response_model=List[ContactRequestSearchHit], tags=["Admin"])
+async def search_contact_requests(
+    q: str = Query(..., min_length=2, max_length=200),
+    status: Optional[str] = None,
+    page: int = Query(1, ge=1, le=100),
+    limit: int = Query(20, ge=1, le=100),
+    ctx: AppContext = Depends(get_context),
+):
+    """Полнотекстовый поиск заявок по имени, сообщению, типу здания и площади"""
+    try:
+        query, projection, sort = text_search(q, status)
+        cursor = ctx.db.contact_requests.find(query, projection).sort(sort).skip((page - 1) * limit).limit(limit)
+        return await cursor.to_list(limit)
+    except Exception as e:
+        logging.error("Error searching contact requests: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка поиска заявок")
+
+@api_router.post("/admin/contact-requests/import", response_model=ImportReport, tags=["Admin"])
+async def import_contact_requests(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    ctx: AppContext = Depends(get_context),
+):
+    """Массовый импорт заявок из CSV или NDJSON (потоковая обработка тела запроса)
+
+    Формат берется из параметра format или заголовка Content-Type.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    blocks = iter_line_blocks(request.stream())
+    rows = iter_csv_rows(blocks) if format == "csv" else iter_ndjson_rows(blocks)
+    importer = LeadImporter(
+        ctx.db.contact_requests,
+        lambda row: build_contact_request(ContactRequestCreate(**row), ctx.settings.dedupe_window_seconds).model_dump(),
+        chunk_size=ctx.settings.import_chunk_size,
+        after_insert=ctx.on_leads_inserted,
+    )
+    try:
+        return await importer.run(rows)
+    except Exception as e:
+        logging.error("Error importing contact requests: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка импорта заявок")
+
+@api_router.get("/admin/contact-requests/export", tags=["Admin"])
+async def export_contact_requests(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    status: Optional[str] = None,
+    building_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    area_min: Optional[float] = Query(None, ge=0),
+    area_max: Optional[float] = Query(None, ge=0),
+    ctx: AppContext = Depends(get_context),
+):
+    """Потоковая выгрузка заявок в NDJSON или CSV (для синхронизации с CRM)"""
+    query = build_lead_filter(status, building_type, created_from, created_to, area_min, area_max)
+    cursor = (
+        ctx.db.contact_requests.find(query, EXPORT_PROJECTION)
+        .sort(LEAD_SORT)
+        .batch_size(ctx.settings.export_batch_size)
+    )
+    if format == "csv":
+        body, media_type = export_csv(cursor), "text/csv; charset=utf-8"
+    else:
+        body, media_type = export_ndjson(cursor), "application/x-ndjson"
+    filename = f"contact-requests-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@api_router.get("/admin/archive/contact-requests", response_model=List[ArchivedContactRequest], tags=["Admin"])
+async def get_archived_contact_requests(
+    response: Response,
+    status: Optional[str] = None,
+    building_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    ctx: AppContext = Depends(get_context),
+):
+    """Архив старых заявок с фильтрами и курсорной пагинацией (X-Next-Cursor)"""
+    try:
+        query = apply_cursor(build_lead_filter(status, building_type, created_from, created_to), cursor)
+        requests = await ctx.db.contact_requests_archive.find(query, {"_id": 0}).sort(LEAD_SORT).to_list(limit + 1)
+        if len(requests) > limit:
+            requests = requests[:limit]
+            last = requests[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(last["created_at"], last["id"])
+        return requests
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error("Error fetching archived contact requests: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка получения архива заявок")
+
+@api_router.get("/admin/archive/contact-requests/{request_id}", response_model=ArchivedContactRequest, tags=["Admin"])
+async def get_archived_contact_request(request_id: str, ctx: AppContext = Depends(get_context)):
+    """Заявка из архива по идентификатору"""
+    try:
+        lead = await ctx.db.contact_requests_archive.find_one({"id": request_id}, {"_id": 0})
+    except Exception as e:
+        logging.error("Error fetching archived contact request: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка получения архива заявок")
+    if lead is None:
+        raise HTTPException(status_code=404, detail="Заявка не найдена в архиве")
+    return lead
+
+@api_router.get("/admin/stats", response_model=LeadStats, tags=["Admin"])
+async def get_lead_stats(days: int = Query(30, ge=1, le=366), ctx: AppContext = Depends(get_context)):
+    """Статистика заявок по статусам, типам зданий и дням (из счетчиков)"""
+    try:
+        return await read_stats(ctx.db.lead_stats, days)
+    except Exception as e:
+        logging.error("Error reading lead stats: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка получения статистики")
+
+@api_router.post("/admin/stats/rebuild", response_model=LeadStats, tags=["Admin"])
+async def rebuild_lead_stats(days: int = Query(30, ge=1, le=366), ctx: AppContext = Depends(get_context)):
+    """Пересчет счетчиков статистики по всем заявкам, включая архив (backfill)"""
+    try:
+        # Buffered increments are for leads the rebuild counts anyway
+        await ctx.lead_stats.flush()
+        await rebuild_stats(ctx.db.contact_requests, ctx.db.lead_stats, ctx.db.contact_requests_archive)
+        return await read_stats(ctx.db.lead_stats, days)
+    except Exception as e:
+        logging.error("Error rebuilding lead stats: %s", e)
+        raise HTTPException(status_code=500, detail="Ошибка пересчета статистики")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+
+# Hot public routes whose access records are sampled (LOG_SAMPLE_RATE)
+SAMPLED_LOG_ROUTES = ("/api/services", "/api/projects")
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the ASGI app; the MongoDB client is opened by its lifespan."""
+    # JSON lines written by a background thread (LOG_FORMAT=text for plain lines); idempotent
+    configure_logging(os.environ.get('LOG_LEVEL', 'INFO'), os.environ.get('LOG_FORMAT', 'json'))
+    if settings is None:
+        settings = Settings.from_env()
+    context = AppContext(settings)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await context.start()
+        try:
+            yield
+        finally:
+            await context.close()
+
+    app = FastAPI(
+        title="Ангастр API",
+        description="API для строительной компании ООО Ангастр",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
+    app.state.context = context
+    app.include_router(api_router)
+
+    rate_limits = parse_rate_limits(settings.rate_limits)
+    if rate_limits:
+        app.add_middleware(
+            RateLimitMiddleware,
+            limiter=ShardedTokenBucketLimiter(rate_limits),
+            trust_proxy=settings.rate_limit_trust_proxy,
+            proxy_hops=settings.rate_limit_proxy_hops,
+        )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "Idempotent-Replayed", "X-Request-ID"],
+    )
+
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+    app.add_middleware(MetricsMiddleware)
+    # Outermost, so the correlation ID covers every other middleware
+    app.add_middleware(
+        RequestLogMiddleware,
+        sample_rates={path: settings.log_sample_rate for path in SAMPLED_LOG_ROUTES},
+    )
+    return app
+
+
+def __getattr__(name: str):
+    # Module-level app for `uvicorn server:app`, built on first access so that
+    # importing the module stays free of side effects
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Production entry point: python server.py --workers 4"""
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Ангастр API")
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', '8001')))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', '1')))
+    args = parser.parse_args(argv)
+    # Each worker process builds its own app (and MongoDB client) after the fork
+    uvicorn.run(
+        "server:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=str(ROOT_DIR),
+        # Requests are logged by RequestLogMiddleware; uvicorn's own records go through the root queue
+        access_log=False,
+        log_config=None,
+    )
+
+
+if __name__ == "__main__":
+    main()
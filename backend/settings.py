@@ -0,0 +1,101 @@
+"""Application settings, read from the environment once per ``create_app`` call."""
+import os
+from pathlib import Path
+from typing import Any, Dict, NamedTuple
+
+from mongo_pool import mongo_client_options
+
+
+class Settings(NamedTuple):
+    mongo_url: str
+    db_name: str
+    mongo_options: Dict[str, Any]
+    # Write-behind batching of contact form inserts
+    write_behind: bool = False
+    contact_batch_size: int = 100
+    contact_batch_window: float = 0.05
+    contact_queue_size: int = 10000
+    contact_queue_put_timeout: float = 1.0
+    # Duplicate submission detection; 0 disables it
+    dedupe_window_seconds: int = 600
+    dedupe_cache_size: int = 10000
+    # Stored contact form responses per Idempotency-Key; 0 disables replay
+    idempotency_ttl_seconds: int = 86400
+    idempotency_cache_size: int = 10000
+    # Per-route token-bucket limits, e.g. "/api/contact-form=5/60"
+    rate_limits: str = ""
+    rate_limit_trust_proxy: bool = False
+    # Proxies in front of the app that append to X-Forwarded-For
+    rate_limit_proxy_hops: int = 1
+    compression_min_size: int = 500
+    content_cache_max_age: int = 300
+    content_reload_interval: float = 30.0
+    lead_events_queue_size: int = 100
+    lead_events_heartbeat: float = 15.0
+    # Leads older than this move to contact_requests_archive; 0 (default) disables archival
+    archive_after_days: int = 0
+    archive_batch_size: int = 500
+    archive_max_batches: int = 20
+    archive_pause: float = 1.0
+    archive_interval: float = 3600.0
+    # Local journal for contact requests while MongoDB is down; empty disables it
+    lead_spool_path: str = ""
+    lead_spool_batch_size: int = 500
+    lead_spool_replay_interval: float = 5.0
+    mongo_breaker_threshold: int = 5
+    mongo_breaker_reset: float = 30.0
+    contact_write_timeout: float = 2.0
+    # Fraction of /api/services and /api/projects access records that are logged
+    log_sample_rate: float = 0.1
+    # Buffered lead_stats counter updates are written this often
+    stats_flush_interval: float = 1.0
+    estimate_cache_size: int = 4096
+    import_chunk_size: int = 1000
+    export_batch_size: int = 1000
+    notify_workers: int = 2
+    notify_batch_size: int = 20
+    notify_max_attempts: int = 8
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            mongo_url=os.environ['MONGO_URL'],
+            db_name=os.environ['DB_NAME'],
+            mongo_options=mongo_client_options(),
+            write_behind=os.environ.get('CONTACT_WRITE_BEHIND', 'false').lower() == 'true',
+            contact_batch_size=int(os.environ.get('CONTACT_BATCH_SIZE', '100')),
+            contact_batch_window=int(os.environ.get('CONTACT_BATCH_WINDOW_MS', '50')) / 1000,
+            contact_queue_size=int(os.environ.get('CONTACT_QUEUE_SIZE', '10000')),
+            contact_queue_put_timeout=int(os.environ.get('CONTACT_QUEUE_PUT_TIMEOUT_MS', '1000')) / 1000,
+            dedupe_window_seconds=int(os.environ.get('DEDUPE_WINDOW_SECONDS', '600')),
+            dedupe_cache_size=int(os.environ.get('DEDUPE_CACHE_SIZE', '10000')),
+            idempotency_ttl_seconds=int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400')),
+            idempotency_cache_size=int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000')),
+            rate_limits=os.environ.get('RATE_LIMITS', ''),
+            rate_limit_trust_proxy=os.environ.get('RATE_LIMIT_TRUST_PROXY', 'false').lower() == 'true',
+            rate_limit_proxy_hops=int(os.environ.get('RATE_LIMIT_PROXY_HOPS', '1')),
+            compression_min_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '500')),
+            content_cache_max_age=int(os.environ.get('CONTENT_CACHE_MAX_AGE', '300')),
+            content_reload_interval=float(os.environ.get('CONTENT_RELOAD_INTERVAL', '30')),
+            lead_events_queue_size=int(os.environ.get('LEAD_EVENTS_QUEUE_SIZE', '100')),
+            lead_events_heartbeat=float(os.environ.get('LEAD_EVENTS_HEARTBEAT_SECONDS', '15')),
+            archive_after_days=int(os.environ.get('ARCHIVE_AFTER_DAYS', '0')),
+            archive_batch_size=int(os.environ.get('ARCHIVE_BATCH_SIZE', '500')),
+            archive_max_batches=int(os.environ.get('ARCHIVE_MAX_BATCHES', '20')),
+            archive_pause=int(os.environ.get('ARCHIVE_PAUSE_MS', '1000')) / 1000,
+            archive_interval=float(os.environ.get('ARCHIVE_INTERVAL_SECONDS', '3600')),
+            lead_spool_path=os.environ.get('LEAD_SPOOL_PATH', str(Path(__file__).parent / 'spool' / 'contact_requests.jsonl')),
+            lead_spool_batch_size=int(os.environ.get('LEAD_SPOOL_BATCH_SIZE', '500')),
+            lead_spool_replay_interval=float(os.environ.get('LEAD_SPOOL_REPLAY_INTERVAL_SECONDS', '5')),
+            mongo_breaker_threshold=int(os.environ.get('MONGO_BREAKER_THRESHOLD', '5')),
+            mongo_breaker_reset=float(os.environ.get('MONGO_BREAKER_RESET_SECONDS', '30')),
+            contact_write_timeout=int(os.environ.get('CONTACT_WRITE_TIMEOUT_MS', '2000')) / 1000,
+            log_sample_rate=float(os.environ.get('LOG_SAMPLE_RATE', '0.1')),
+            stats_flush_interval=int(os.environ.get('STATS_FLUSH_INTERVAL_MS', '1000')) / 1000,
+            estimate_cache_size=int(os.environ.get('ESTIMATE_CACHE_SIZE', '4096')),
+            import_chunk_size=int(os.environ.get('IMPORT_CHUNK_SIZE', '1000')),
+            export_batch_size=int(os.environ.get('EXPORT_BATCH_SIZE', '1000')),
+            notify_workers=int(os.environ.get('NOTIFY_WORKERS', '2')),
+            notify_batch_size=int(os.environ.get('NOTIFY_BATCH_SIZE', '20')),
+            notify_max_attempts=int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '8')),
+        )
@@ -0,0 +1,163 @@
+"""Non-blocking structured logging with per-request correlation IDs.
+
+Log calls on the event loop only enqueue the record: ``configure_logging``
+installs a ``QueueHandler`` on the root logger and a ``QueueListener`` thread
+that formats (as JSON lines by default) and writes the records, so a slow disk
+or log collector never stalls request handling. Use lazy %-style arguments;
+the message is rendered on the listener thread.
+
+``RequestLogMiddleware`` assigns every HTTP request a correlation ID (taken
+from a well-formed incoming ``X-Request-ID`` or generated), exposes it to all
+log records emitted while handling the request, returns it in the
+``X-Request-ID`` response header and writes one access record with timing
+fields. Access records of hot routes can be sampled.
+"""
+import atexit
+import copy
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+import orjson
+
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+REQUEST_ID_RE = re.compile(rb"[A-Za-z0-9._\-]{1,128}")
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class ContextQueueHandler(QueueHandler):
+    """QueueHandler that attaches the request ID and defers all formatting."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The base class renders the message here, on the event loop; the
+        # listener's formatter does it instead
+        record = copy.copy(record)
+        record.request_id = request_id_var.get()
+        return record
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json") -> QueueListener:
+    """Route the root logger through a queue; safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return _listener
+    output = logging.StreamHandler(sys.stderr)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(
+            logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s')
+        )
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(ContextQueueHandler(log_queue))
+    root.setLevel(level.upper())
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    # Flush records still in the queue when the process exits
+    atexit.register(_listener.stop)
+    return _listener
+
+
+access_logger = logging.getLogger("access")
+
+
+class RequestLogMiddleware:
+    """ASGI middleware: correlation ID, X-Request-ID header and a timed access record.
+
+    ``sample_rates`` maps route paths to the fraction of their successful
+    requests that are logged; errors (status >= 500) are always logged.
+    """
+
+    def __init__(self, app, sample_rates: Optional[Dict[str, float]] = None):
+        self.app = app
+        self.sample_rates = sample_rates or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                if REQUEST_ID_RE.fullmatch(value):
+                    request_id = value.decode()
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        status_code = 500
+        started = time.perf_counter()
+        first_byte: Optional[float] = None
+
+        async def send_wrapper(message):
+            nonlocal status_code, first_byte
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                first_byte = time.perf_counter()
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() != REQUEST_ID_HEADER]
+                headers.append((REQUEST_ID_HEADER, request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None)
+            rate = self.sample_rates.get(route, 1.0)
+            if status_code >= 500 or rate >= 1.0 or random.random() < rate:
+                access_logger.info(
+                    "%s %s %s %.1f ms",
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    duration * 1000,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": route,
+                        "status": status_code,
+                        "duration_ms": round(duration * 1000, 3),
+                        "ttfb_ms": round((first_byte - started) * 1000, 3) if first_byte else None,
+                        "sample_rate": rate,
+                    },
+                )
+            request_id_var.reset(token)
@@ -0,0 +1,76 @@
+"""Phone and email validation with canonicalization for contact requests.
+
+Patterns are compiled once at import time, and validation and canonicalization
+share a single match, so a valid phone yields its E.164 form for free. The
+free-text area field is parsed into square meters the same way.
+"""
+import re
+from typing import Optional
+
+
+# Российский формат: +7 (XXX) XXX-XX-XX, 8XXXXXXXXXX или 10 цифр без кода страны
+PHONE_RE = re.compile(r'(?:\+7|8)?([0-9]{10})')
+# Any whitespace (tabs, no-break spaces from spreadsheets), brackets and dashes
+PHONE_SEPARATORS_RE = re.compile(r'[\s()\-]+')
+EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# Площадь: "1500 м²", "1 500 кв.м", "30x50", "30 х 50 м", "1000-1500", "от 1000 до 1500", "0,5 га"
+NUMBER = r'(\d+(?:\.\d+)?)'
+THOUSANDS_SEPARATOR_RE = re.compile(r'(?<=\d)[ \u00a0\u202f\'](?=\d{3}(?!\d))')
+AREA_DIMENSIONS_RE = re.compile(NUMBER + r'\s*[xх×*]\s*' + NUMBER)
+AREA_RANGE_RE = re.compile(NUMBER + r'\s*(?:-|–|—|до)\s*' + NUMBER)
+AREA_NUMBER_RE = re.compile(NUMBER)
+HECTARE_RE = re.compile(r'\d\s*га\b')
+MIN_AREA_SQM = 10
+MAX_AREA_SQM = 1_000_000
+
+
+def canonical_phone(phone: str) -> Optional[str]:
+    """Return the phone in E.164 (``+7XXXXXXXXXX``) or None if it is invalid."""
+    # Chained str.replace is faster than str.translate or re.sub for short strings;
+    # the regex only runs for other separators
+    match = PHONE_RE.fullmatch(phone.replace(' ', '').replace('-', '').replace('(', '').replace(')', ''))
+    if match is None:
+        match = PHONE_RE.fullmatch(PHONE_SEPARATORS_RE.sub('', phone))
+    if match is None:
+        return None
+    return '+7' + match.group(1)
+
+
+def is_valid_email(email: str) -> bool:
+    return EMAIL_RE.fullmatch(email) is not None
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Lower-cased, stripped email; None for missing or blank input."""
+    if email is None:
+        return None
+    email = email.strip()
+    return email.lower() if email else None
+
+
+def parse_area_sqm(area: Optional[str]) -> Optional[float]:
+    """Square meters from a free-text area, or None if no plausible number is found.
+
+    Dimensions are multiplied and ranges give their midpoint.
+    """
+    if not area:
+        return None
+    text = THOUSANDS_SEPARATOR_RE.sub('', area.lower()).replace(',', '.')
+    match = AREA_DIMENSIONS_RE.search(text)
+    if match is not None:
+        value = float(match.group(1)) * float(match.group(2))
+    else:
+        match = AREA_RANGE_RE.search(text)
+        if match is not None:
+            value = (float(match.group(1)) + float(match.group(2))) / 2
+        else:
+            match = AREA_NUMBER_RE.search(text)
+            if match is None:
+                return None
+            value = float(match.group(1))
+        if HECTARE_RE.search(text):
+            value *= 10_000
+    if not MIN_AREA_SQM <= value <= MAX_AREA_SQM:
+        return None
+    return round(value, 1)
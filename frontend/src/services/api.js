@@ -2,40 +2,75 @@
 const API_BASE = process.env.REACT_APP_BACKEND_URL + '/api';
 
 // Contact Form API
-export const submitContactForm = async (formData) => {
-  try {
-    const response = await fetch(`${API_BASE}/contact-form`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        name: formData.name,
-        phone: formData.phone,
-        email: formData.email || null,
-        buildingType: formData.buildingType || null,
-        area: formData.area || null,
-        message: formData.message || null
-      })
-    });
+const CONTACT_FORM_ATTEMPTS = 3;
+const CONTACT_FORM_TIMEOUT_MS = 15000;
 
-    const data = await response.json();
+const createIdempotencyKey = () => {
+  if (window.crypto && window.crypto.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+};
 
-    if (!response.ok) {
-      throw new Error(data.message || `HTTP error! status: ${response.status}`);
-    }
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
 
-    return {
-      success: true,
-      data: data
-    };
-  } catch (error) {
-    console.error('Contact form submission error:', error);
-    return {
-      success: false,
-      error: error.message || 'Произошла ошибка при отправке формы'
-    };
+// Retries after timeouts, network errors and 5xx/409 responses reuse the same
+// Idempotency-Key, so the server saves the request only once
+export const submitContactForm = async (formData) => {
+  const idempotencyKey = createIdempotencyKey();
+  const body = JSON.stringify({
+    name: formData.name,
+    phone: formData.phone,
+    email: formData.email || null,
+    buildingType: formData.buildingType || null,
+    area: formData.area || null,
+    message: formData.message || null
+  });
+
+  let lastError = null;
+  for (let attempt = 1; attempt <= CONTACT_FORM_ATTEMPTS; attempt++) {
+    const controller = new AbortController();
+    const timeout = setTimeout(() => controller.abort(), CONTACT_FORM_TIMEOUT_MS);
+    try {
+      const response = await fetch(`${API_BASE}/contact-form`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey,
+        },
+        body,
+        signal: controller.signal
+      });
+
+      const data = await response.json();
+
+      if (!response.ok) {
+        const error = new Error(data.message || `HTTP error! status: ${response.status}`);
+        error.retryable = response.status >= 500 || response.status === 409;
+        throw error;
+      }
+
+      return {
+        success: true,
+        data: data
+      };
+    } catch (error) {
+      lastError = error;
+      // Network failures and aborted (timed out) requests have no status and are retried
+      if (error.retryable === false || attempt === CONTACT_FORM_ATTEMPTS) {
+        break;
+      }
+      await sleep(500 * 2 ** (attempt - 1));
+    } finally {
+      clearTimeout(timeout);
+    }
   }
+
+  console.error('Contact form submission error:', lastError);
+  return {
+    success: false,
+    error: (lastError && lastError.message) || 'Произошла ошибка при отправке формы'
+  };
 };
 
 // Company Info API
@@ -125,6 +160,41 @@ export const getProjects = async () => {
   }
 };
 
+// Cost estimate API (calculator widget)
+export const getEstimate = async ({ buildingType, area, frame = 'straight', insulation = 'cold' }) => {
+  try {
+    const params = new URLSearchParams({
+      building_type: buildingType,
+      area: String(area),
+      frame,
+      insulation
+    });
+    const response = await fetch(`${API_BASE}/estimate?${params}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      }
+    });
+
+    const data = await response.json();
+
+    if (!response.ok) {
+      throw new Error(data.detail || `HTTP error! status: ${response.status}`);
+    }
+
+    return {
+      success: true,
+      data: data
+    };
+  } catch (error) {
+    console.error('Estimate fetch error:', error);
+    return {
+      success: false,
+      error: error.message || 'Ошибка расчета стоимости'
+    };
+  }
+};
+
 // Admin API (optional)
 export const getContactRequests = async () => {
   try {
@@ -152,4 +222,28 @@ export const getContactRequests = async () => {
       error: error.message || 'Ошибка загрузки заявок'
     };
   }
-};
\ No newline at end of file
+};
+
+// Live feed of new contact requests (Server-Sent Events).
+// Returns a function that closes the connection.
+export const subscribeToContactRequests = (onRequest, onError) => {
+  const source = new EventSource(`${API_BASE}/admin/contact-requests/stream`);
+
+  source.addEventListener('lead', (event) => {
+    try {
+      onRequest(JSON.parse(event.data));
+    } catch (error) {
+      console.error('Contact request event parse error:', error);
+    }
+  });
+
+  // EventSource reconnects automatically; report the interruption
+  source.onerror = (error) => {
+    console.error('Contact requests stream error:', error);
+    if (onError) {
+      onError(error);
+    }
+  };
+
+  return () => source.close();
+};
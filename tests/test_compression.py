@@ -0,0 +1,109 @@
+import gzip
+
+import pytest
+
+import compression
+from compression import CompressionMiddleware, negotiate_encoding
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0.5, gzip;q=0.8", "gzip"),
+        ("GZIP;q=0.9, br;q=1.0", "br"),
+        ("*", "br"),
+        ("*;q=0.5, br;q=0", "gzip"),
+        ("gzip;q=0, *;q=0", None),
+        ("gzip;q=bogus", None),
+    ],
+)
+def test_negotiate_encoding(monkeypatch, accept_encoding, expected):
+    monkeypatch.setattr(compression, "SUPPORTED_ENCODINGS", ("br", "gzip"))
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_negotiate_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "SUPPORTED_ENCODINGS", ("gzip",))
+    assert negotiate_encoding("br, gzip;q=0.1") == "gzip"
+    assert negotiate_encoding("br") is None
+
+
+def json_app(body_chunks, content_type=b"application/json", status=200, extra_headers=()):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", content_type), (b"etag", b'"abc"'), *extra_headers]
+        if len(body_chunks) == 1:
+            headers.append((b"content-length", str(len(body_chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        for i, chunk in enumerate(body_chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(body_chunks) - 1})
+
+    return app
+
+
+async def call(app, accept_encoding="gzip"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    await CompressionMiddleware(app, minimum_size=100)(scope, None, send)
+    headers = dict(messages[0]["headers"])
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return messages[0]["status"], headers, body
+
+
+BODY = b'{"items": [' + b'"value", ' * 50 + b'"end"]}'
+
+
+@pytest.mark.anyio
+async def test_large_body_is_compressed_with_weak_etag():
+    status, headers, body = await call(json_app([BODY]))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert headers[b"etag"] == b'W/"abc"'
+    assert int(headers[b"content-length"]) == len(body)
+    assert gzip.decompress(body) == BODY
+
+
+@pytest.mark.anyio
+async def test_streamed_body_is_compressed_incrementally():
+    chunks = [BODY[:60], BODY[60:200], BODY[200:]]
+    status, headers, body = await call(json_app(chunks, content_type=b"application/x-ndjson"))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    assert gzip.decompress(body) == BODY
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "app",
+    [
+        # Below the size threshold
+        json_app([b'{"ok": true}']),
+        # Already encoded, e.g. a precompressed content cache payload
+        json_app([gzip.compress(BODY)], extra_headers=[(b"content-encoding", b"gzip")]),
+        json_app([BODY], content_type=b"image/png"),
+        # Server-Sent Events must not be buffered by the compressor
+        json_app([BODY[:60], BODY[60:]], content_type=b"text/event-stream"),
+        json_app([b""], status=304),
+    ],
+)
+async def test_passthrough(app):
+    status, headers, body = await call(app)
+    original_status, original_headers, original_body = await call(app, accept_encoding="identity")
+    assert (status, headers, body) == (original_status, original_headers, original_body)
+    assert headers[b"etag"] == b'"abc"'
+
+
+@pytest.mark.anyio
+async def test_no_accept_encoding_passes_through():
+    status, headers, body = await call(json_app([BODY]), accept_encoding="identity")
+    assert b"content-encoding" not in headers
+    assert body == BODY
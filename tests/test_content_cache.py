@@ -0,0 +1,95 @@
+import gzip
+
+import pytest
+from fastapi import Request
+
+import compression
+from content_cache import ContentCache, etag_matches
+
+
+def make_request(if_none_match=None, accept_encoding=None):
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    if accept_encoding is not None:
+        headers.append((b"accept-encoding", accept_encoding.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (None, False),
+        ("", False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"other", "abc"', True),
+        ('"other"', False),
+        ("*", True),
+        ("abc", False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, '"abc"') is expected
+    # Weak comparison: a weak ETag matches its strong form and vice versa
+    assert etag_matches(if_none_match, 'W/"abc"') is expected
+
+
+def test_ensure_rebuilds_only_on_version_change():
+    cache = ContentCache()
+    builds = []
+
+    def builder():
+        builds.append(1)
+        return {"services": b"[1]"}
+
+    cache.ensure("v1", builder)
+    etag = cache.get("services").etag
+    cache.ensure("v1", builder)
+    assert len(builds) == 1
+    cache.ensure("v2", builder)
+    assert len(builds) == 2
+    # Same body, new version: clients must revalidate
+    assert cache.get("services").etag != etag
+
+
+def test_response_and_not_modified():
+    cache = ContentCache(max_age=60)
+    cache.ensure("v1", lambda: {"services": b"[1]"})
+    response = cache.response("services", make_request())
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert response.body == b"[1]"
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+    not_modified = cache.response("services", make_request(etag))
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["etag"] == etag
+
+    assert cache.response("services", make_request('"stale"')).status_code == 200
+
+
+def test_precompressed_payloads_have_their_own_etags(monkeypatch):
+    monkeypatch.setattr(compression, "SUPPORTED_ENCODINGS", ("gzip",))
+    large = b"[" + b'"item",' * 200 + b'"end"]'
+    cache = ContentCache(min_compress_size=500)
+    cache.ensure("v1", lambda: {"small": b"[1]", "large": large})
+
+    small = cache.response("small", make_request())
+    assert "content-encoding" not in small.headers and "vary" not in small.headers
+
+    plain = cache.response("large", make_request())
+    assert plain.body == large and "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+
+    encoded = cache.response("large", make_request(accept_encoding="gzip"))
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(encoded.body) == large
+    assert encoded.headers["etag"] != plain.headers["etag"]
+
+    # Revalidating the gzip representation; the plain ETag does not match it
+    not_modified = cache.response("large", make_request(encoded.headers["etag"], "gzip"))
+    assert not_modified.status_code == 304
+    assert "content-encoding" not in not_modified.headers
+    assert cache.response("large", make_request(plain.headers["etag"], "gzip")).status_code == 200
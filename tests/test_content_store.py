@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from content_cache import ContentCache
+from content_store import ContentStore
+
+DEFAULTS = {
+    "services": [{"id": 1, "category": "Склады"}, {"id": 2, "category": "Ангары"}],
+    "projects": [{"id": 1, "title": "Склад 2400 м²"}],
+}
+
+
+def build_payloads(catalogs):
+    return {kind: json.dumps(items, ensure_ascii=False).encode() for kind, items in catalogs.items()}
+
+
+def served(store, kind):
+    return json.loads(store.cache.get(kind).body)
+
+
+@pytest.fixture
+def store(db):
+    return ContentStore(db, ContentCache(), build_payloads, version_prefix="1")
+
+
+@pytest.mark.anyio
+async def test_missing_meta_serves_defaults_then_seeds(store, db):
+    # Mongo was down at startup: seed() never ran
+    store.use_defaults(DEFAULTS)
+    assert store.cache.version == "1.defaults"
+    assert [item["id"] for item in served(store, "services")] == [1, 2]
+    # The first refresh seeds instead of publishing the empty collections
+    assert await store.refresh() is True
+    assert store.cache.version == "1.1"
+    assert [item["id"] for item in served(store, "services")] == [1, 2]
+    assert await db.services.count_documents({}) == 2
+    assert await store.refresh() is False
+
+
+@pytest.mark.anyio
+async def test_refresh_without_defaults_keeps_the_snapshot(store):
+    assert await store.refresh() is False
+    assert store.cache.version is None
+
+
+@pytest.mark.anyio
+async def test_writes_bump_the_version_and_rebuild(store):
+    store.use_defaults(DEFAULTS)
+    await store.seed(DEFAULTS)
+    await store.refresh()
+
+    created = await store.create("services", {"category": "Цеха"})
+    assert created == {"id": 3, "category": "Цеха"}
+    assert store.cache.version == "1.2"
+    assert [item["category"] for item in served(store, "services")] == ["Склады", "Ангары", "Цеха"]
+
+    assert await store.replace("services", 3, {"category": "Производственные цеха"}) == {
+        "id": 3,
+        "category": "Производственные цеха",
+    }
+    assert store.cache.version == "1.3"
+    assert served(store, "services")[-1]["category"] == "Производственные цеха"
+
+    assert await store.delete("services", 1) is True
+    assert store.cache.version == "1.4"
+    assert [item["id"] for item in served(store, "services")] == [2, 3]
+
+    # Missing items change nothing
+    assert await store.replace("services", 99, {"category": "Нет"}) is None
+    assert await store.delete("services", 99) is False
+    assert store.cache.version == "1.4"
+
+
+@pytest.mark.anyio
+async def test_create_before_seed_keeps_the_defaults(store, db):
+    store.use_defaults(DEFAULTS)
+    created = await store.create("services", {"category": "Цеха"})
+    # The defaults were seeded first, so the new item does not reuse their ids
+    assert created["id"] == 3
+    assert [item["id"] for item in served(store, "services")] == [1, 2, 3]
+    assert [item["id"] for item in served(store, "projects")] == [1]
+    assert await db.services.count_documents({}) == 3
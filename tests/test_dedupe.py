@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from dedupe import DuplicateDetector, dedupe_key, lead_content_hash
+
+
+def test_content_hash_ignores_case_and_whitespace():
+    lead = ("+79186333221", "Иван", None, "Склад", "1500 м²", " Нужен  склад ")
+    assert lead_content_hash(*lead) == lead_content_hash("+79186333221", "иван", None, "склад", "1500 м²", "нужен склад")
+    assert lead_content_hash(*lead) != lead_content_hash(*lead[:-1], "Нужен ангар")
+
+
+def test_dedupe_key_buckets_by_window():
+    created_at = datetime(2024, 5, 17, 12, 0, 0)
+    assert dedupe_key("h", created_at, 600) == dedupe_key("h", created_at + timedelta(seconds=59), 600)
+    assert dedupe_key("h", created_at, 600) != dedupe_key("h", created_at + timedelta(seconds=600), 600)
+
+
+@pytest.mark.anyio
+async def test_find_original_falls_back_to_mongo_within_window(db):
+    detector = DuplicateDetector(db.contact_requests, window_seconds=600)
+    now = datetime.utcnow()
+    await db.contact_requests.insert_many([
+        {"id": "old", "phone_e164": "+79186333221", "content_hash": "h", "created_at": now - timedelta(hours=1)},
+        {"id": "recent", "phone_e164": "+79186333221", "content_hash": "h", "created_at": now - timedelta(minutes=1)},
+    ])
+    assert await detector.find_original("+79186333221", "h", cached_only=True) is None
+    assert await detector.find_original("+79186333221", "h") == "recent"
+    # The hit is cached and served without Mongo
+    await db.contact_requests.delete_many({})
+    assert await detector.find_original("+79186333221", "h", cached_only=True) == "recent"
+    assert await detector.find_original("+79186333221", "other") is None
+
+
+@pytest.mark.anyio
+async def test_claim_and_forget(db):
+    detector = DuplicateDetector(db.contact_requests, window_seconds=600)
+    assert detector.claim("+79186333221", "h", "first") is None
+    assert detector.claim("+79186333221", "h", "second") == "first"
+    detector.forget("+79186333221", "h")
+    assert detector.claim("+79186333221", "h", "second") is None
+
+
+@pytest.mark.anyio
+async def test_resolve_conflict_points_the_cache_at_the_stored_lead(db):
+    detector = DuplicateDetector(db.contact_requests, window_seconds=600)
+    # This worker claimed "mine", but another worker stored "theirs" under the same dedupe_key
+    assert detector.claim("+79186333221", "h", "mine") is None
+    await db.contact_requests.insert_one({"id": "theirs", "dedupe_key": "h:1"})
+    assert await detector.resolve_conflict("+79186333221", "h", "h:1") == "theirs"
+    assert await detector.find_original("+79186333221", "h") == "theirs"
+    # Nothing stored under the key: the stale claim is dropped
+    assert await detector.resolve_conflict("+79186333221", "h", "h:2") is None
+    assert detector.cache.get(("+79186333221", "h")) is None
@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from idempotency import IdempotencyInProgress, IdempotencyKeyReused, IdempotencyStore, request_fingerprint
+
+
+class Handler:
+    def __init__(self, response=None, error=None):
+        self.calls = 0
+        self.response = response or {"id": "lead-1"}
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests_share_one_handler_run(db):
+    store = IdempotencyStore(db.idempotency_keys)
+    handler = Handler()
+    fingerprint = request_fingerprint('{"name": "Иван"}'.encode())
+    tasks = [asyncio.create_task(store.run("key", fingerprint, handler)) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    handler.release.set()
+    results = await asyncio.gather(*tasks)
+    assert handler.calls == 1
+    assert [response for response, _ in results] == [{"id": "lead-1"}] * 5
+    assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+    doc = await db.idempotency_keys.find_one({"_id": "key"})
+    assert doc["status"] == "completed" and "lease_until" not in doc
+
+
+@pytest.mark.anyio
+async def test_completed_key_is_replayed_from_mongo(db):
+    handler = Handler()
+    handler.release.set()
+    await IdempotencyStore(db.idempotency_keys).run("key", "fp", handler)
+    # A fresh store (another worker) has an empty cache and reads the stored response
+    assert await IdempotencyStore(db.idempotency_keys).run("key", "fp", handler) == ({"id": "lead-1"}, True)
+    assert handler.calls == 1
+
+
+@pytest.mark.anyio
+async def test_key_reused_with_another_body(db):
+    store = IdempotencyStore(db.idempotency_keys)
+    handler = Handler()
+    handler.release.set()
+    await store.run("key", "fp", handler)
+    with pytest.raises(IdempotencyKeyReused):
+        await store.run("key", "other", handler)
+    with pytest.raises(IdempotencyKeyReused):
+        await IdempotencyStore(db.idempotency_keys).run("key", "other", handler)
+    assert handler.calls == 1
+
+
+@pytest.mark.anyio
+async def test_concurrent_request_with_another_body_is_rejected(db):
+    store = IdempotencyStore(db.idempotency_keys)
+    handler = Handler()
+    first = asyncio.create_task(store.run("key", "fp", handler))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(store.run("key", "other", handler))
+    handler.release.set()
+    assert await first == ({"id": "lead-1"}, False)
+    with pytest.raises(IdempotencyKeyReused):
+        await second
+
+
+@pytest.mark.anyio
+async def test_failed_handler_releases_the_key(db):
+    store = IdempotencyStore(db.idempotency_keys)
+    failing = Handler(error=RuntimeError("boom"))
+    failing.release.set()
+    with pytest.raises(RuntimeError):
+        await store.run("key", "fp", failing)
+    assert await db.idempotency_keys.find_one({"_id": "key"}) is None
+    handler = Handler()
+    handler.release.set()
+    assert await store.run("key", "fp", handler) == ({"id": "lead-1"}, False)
+
+
+@pytest.mark.anyio
+async def test_pending_claim_on_another_worker(db):
+    now = datetime.utcnow()
+    claim = {"_id": "key", "status": "pending", "fingerprint": "fp", "expires_at": now + timedelta(days=1)}
+    await db.idempotency_keys.insert_one({**claim, "lease_until": now + timedelta(seconds=30)})
+    store = IdempotencyStore(db.idempotency_keys, wait_timeout=0.05, poll_interval=0.01)
+    handler = Handler()
+    handler.release.set()
+    with pytest.raises(IdempotencyInProgress):
+        await store.run("key", "fp", handler)
+    # Once the lease runs out the claim is taken over
+    await db.idempotency_keys.update_one({"_id": "key"}, {"$set": {"lease_until": now - timedelta(seconds=1)}})
+    assert await store.run("key", "fp", handler) == ({"id": "lead-1"}, False)
+    assert handler.calls == 1
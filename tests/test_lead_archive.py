@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pymongo.errors import BulkWriteError
+
+import lead_archive
+from lead_archive import ARCHIVE_FIELDS, LeadArchiver
+from lead_stats import rebuild_stats
+
+NOW = datetime.utcnow()
+
+
+def lead(lead_id, age_days, **fields):
+    return {
+        "id": lead_id,
+        "name": "Иван",
+        "phone": "+7 (918) 633-32-21",
+        "phone_e164": "+79186333221",
+        "email": None,
+        "building_type": "Склад",
+        "area": "1500 м²",
+        "area_sqm": 1500.0,
+        "message": "Нужен склад",
+        "status": "new",
+        "version": 0,
+        "content_hash": "h",
+        "dedupe_key": f"h:{lead_id}",
+        "created_at": NOW - timedelta(days=age_days),
+        **fields,
+    }
+
+
+def make_archiver(db, **kwargs):
+    return LeadArchiver(db.contact_requests, db.contact_requests_archive, max_age_days=365, **kwargs)
+
+
+async def ids(collection):
+    return sorted([doc["id"] async for doc in collection.find({}, {"id": 1})])
+
+
+@pytest.mark.anyio
+async def test_only_leads_older_than_the_cutoff_move(db):
+    await db.contact_requests.insert_many([lead("old", 400), lead("recent", 30)])
+    assert await make_archiver(db).archive_once() == 1
+    assert await ids(db.contact_requests) == ["recent"]
+    assert await ids(db.contact_requests_archive) == ["old"]
+
+
+@pytest.mark.anyio
+async def test_archive_keeps_a_trimmed_schema(db):
+    await db.contact_requests.insert_one(lead("old", 400, notify={"status": "sent"}))
+    await make_archiver(db).archive_once()
+    archived = await db.contact_requests_archive.find_one({"id": "old"}, {"_id": 0})
+    # Derived and dedupe fields are dropped, and so are empty ones
+    assert set(archived) == set(ARCHIVE_FIELDS) - {"email", "status_changed_at"} | {"archived_at"}
+    assert archived["phone"] == "+7 (918) 633-32-21"
+
+
+@pytest.mark.anyio
+async def test_duplicates_left_by_a_crash_still_delete_the_source(db):
+    await db.contact_requests.insert_many([lead("copied", 400), lead("pending", 401)])
+    await db.contact_requests_archive.create_index("id", unique=True)
+    # The previous run copied "copied" and died before deleting it
+    await db.contact_requests_archive.insert_one({"id": "copied", "archived_at": NOW})
+    assert await make_archiver(db).archive_batch(NOW - timedelta(days=365)) == 2
+    assert await ids(db.contact_requests) == []
+    assert await ids(db.contact_requests_archive) == ["copied", "pending"]
+
+
+class FailingArchive:
+    """Rejects the second document of every insert with a validation error."""
+
+    async def insert_many(self, docs, ordered=True):
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "Document failed validation"}]})
+
+
+@pytest.mark.anyio
+async def test_other_write_errors_delete_nothing(db):
+    await db.contact_requests.insert_many([lead("a", 400), lead("b", 401)])
+    archiver = LeadArchiver(db.contact_requests, FailingArchive(), max_age_days=365)
+    with pytest.raises(BulkWriteError):
+        await archiver.archive_batch(NOW - timedelta(days=365))
+    assert await ids(db.contact_requests) == ["a", "b"]
+
+
+@pytest.mark.anyio
+async def test_runs_are_capped_and_pause_between_batches(db, monkeypatch):
+    pauses = []
+
+    async def sleep(seconds):
+        pauses.append(seconds)
+
+    monkeypatch.setattr(lead_archive.asyncio, "sleep", sleep)
+    await db.contact_requests.insert_many([lead(f"old-{i}", 400 + i) for i in range(5)])
+    archiver = make_archiver(db, batch_size=2, max_batches=2, pause=0.5)
+    assert await archiver.archive_once() == 4
+    assert pauses == [0.5, 0.5]
+    # Oldest first: the newest old lead waits for the next run
+    assert await ids(db.contact_requests) == ["old-0"]
+    # A short batch ends the run without another pause
+    pauses.clear()
+    assert await archiver.archive_once() == 1
+    assert pauses == []
+
+
+@pytest.fixture
+def client(db):
+    import server
+
+    app = FastAPI()
+    app.include_router(server.api_router)
+
+    context = SimpleNamespace(db=db)
+    app.dependency_overrides[server.get_context] = lambda: context
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.anyio
+async def test_archive_routes(db, client):
+    await db.contact_requests.insert_many([lead(f"old-{i}", 400 + i, status="done" if i % 2 else "new") for i in range(3)])
+    await make_archiver(db).archive_once()
+
+    async with client:
+        response = await client.get("/api/admin/archive/contact-requests", params={"limit": 2})
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()] == ["old-0", "old-1"]
+        cursor = response.headers["X-Next-Cursor"]
+        response = await client.get("/api/admin/archive/contact-requests", params={"limit": 2, "cursor": cursor})
+        assert [item["id"] for item in response.json()] == ["old-2"]
+        assert "X-Next-Cursor" not in response.headers
+
+        response = await client.get("/api/admin/archive/contact-requests", params={"status": "done"})
+        assert [item["id"] for item in response.json()] == ["old-1"]
+
+        response = await client.get("/api/admin/archive/contact-requests/old-2")
+        assert response.status_code == 200
+        assert response.json()["archived_at"]
+        assert (await client.get("/api/admin/archive/contact-requests/missing")).status_code == 404
+
+
+@pytest.mark.anyio
+async def test_rebuild_stats_counts_archived_leads(db):
+    await db.contact_requests.insert_many([lead("old", 400, status="done"), lead("recent", 1)])
+    await make_archiver(db).archive_once()
+    assert await rebuild_stats(db.contact_requests, db.lead_stats, db.contact_requests_archive) == 2
+    counters = {doc["_id"]: doc["count"] async for doc in db.lead_stats.find()}
+    assert counters["total:all"] == 2
+    assert counters["status:done"] == 1
+    assert counters["status:new"] == 1
+    assert counters["building_type:Склад"] == 2
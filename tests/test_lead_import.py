@@ -0,0 +1,108 @@
+import pytest
+from pydantic import BaseModel
+
+import lead_import
+from lead_import import LeadImporter, iter_csv_records, iter_csv_rows, iter_line_blocks, iter_ndjson_rows
+
+
+class ImportRow(BaseModel):
+    id: str
+
+
+async def chunks(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def parse(parser, body: bytes, size: int = 7):
+    return [row async for row in parser(iter_line_blocks(chunks(body, size)))]
+
+
+@pytest.mark.anyio
+async def test_ndjson_rows():
+    body = (
+        '{"name": "Иван", "building_type": "Склад"}\n'
+        "\n"
+        "{broken\n"
+        "[1, 2]\n"
+        '{"name": "Пётр", "buildingType": "Ангар"}'
+    ).encode()
+    rows = await parse(iter_ndjson_rows, body)
+    assert rows[0] == (1, {"name": "Иван", "buildingType": "Склад"}, None)
+    assert rows[1][:2] == (2, None) and rows[1][2].startswith("Неверный JSON")
+    assert rows[2] == (3, None, "Строка должна быть JSON-объектом")
+    assert rows[3] == (4, {"name": "Пётр", "buildingType": "Ангар"}, None)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("size", [1, 5, 1000])
+async def test_csv_rows(size):
+    body = (
+        "\ufeffName,Phone,Building_Type,Message\r\n"
+        'Иван,+79186333221,Склад,"Первая строка\nвторая, с ""кавычками"""\r\n'
+        "Пётр,89186333222,,\r\n"
+        "Лишний,1,2,3,4\r\n"
+    ).encode()
+    rows = await parse(iter_csv_rows, body, size)
+    assert rows == [
+        (
+            1,
+            {"name": "Иван", "phone": "+79186333221", "buildingType": "Склад", "message": 'Первая строка\nвторая, с "кавычками"'},
+            None,
+        ),
+        (2, {"name": "Пётр", "phone": "89186333222"}, None),
+        (3, None, "Лишние колонки в строке"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_csv_quote_inside_unquoted_field_does_not_hold_back_records():
+    blocks_sent = 0
+
+    async def blocks():
+        nonlocal blocks_sent
+        yield ["name,message", 'ООО "Ромашка,труба 5" дюймов']
+        for i in range(4):
+            blocks_sent += 1
+            yield [f"row{i},text"]
+
+    records = []
+    async for record in iter_csv_records(blocks()):
+        records.append((blocks_sent, record))
+    assert records[1] == (0, ['ООО "Ромашка', 'труба 5" дюймов'])
+    # Every record comes out with its own block, not at the end of the body
+    assert [sent for sent, _ in records[2:]] == [1, 2, 3, 4]
+
+
+@pytest.mark.anyio
+async def test_csv_unterminated_quote_is_capped(monkeypatch):
+    monkeypatch.setattr(lead_import, "MAX_QUOTED_FIELD_LINES", 3)
+
+    async def blocks():
+        yield ["name,message", 'Иван,"без закрывающей кавычки']
+        for i in range(5):
+            yield [f"row{i},text"]
+
+    records = [record async for record in iter_csv_records(blocks())]
+    assert records[1] == ["Иван", "без закрывающей кавычки"]
+    assert records[2:] == [[f"row{i}", "text"] for i in range(5)]
+
+
+@pytest.mark.anyio
+async def test_importer_reports_duplicates_and_invalid_rows(db):
+    await db.contact_requests.create_index("id", unique=True)
+    importer = LeadImporter(db.contact_requests, lambda row: ImportRow(**row).model_dump(), chunk_size=2)
+
+    async def rows():
+        yield 1, {"id": "a"}, None
+        yield 2, {"id": "a"}, None
+        yield 3, {"name": "без id"}, None
+        yield 4, None, "Неверный JSON"
+        yield 5, {"id": "b"}, None
+
+    result = await importer.run(rows())
+    assert result["received"] == 5 and result["inserted"] == 2 and result["failed"] == 3
+    assert result["errors"][0] == {"row": 3, "error": "id: Field required"}
+    assert {"row": 2, "error": "Дубликат заявки"} in result["errors"]
+    assert {"row": 4, "error": "Неверный JSON"} in result["errors"]
+    assert sorted([doc["id"] async for doc in db.contact_requests.find()]) == ["a", "b"]
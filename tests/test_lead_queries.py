@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from lead_queries import InvalidCursor, apply_cursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 17, 12, 30, 15, 123456)
+    cursor = encode_cursor(created_at, "lead-1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, "lead-1")
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "e30", encode_cursor(datetime(2024, 1, 1), "x")[:-4]])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_apply_cursor_combines_with_filter():
+    created_at = datetime(2024, 5, 17)
+    after = {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": "lead-1"}},
+        ]
+    }
+    cursor = encode_cursor(created_at, "lead-1")
+    assert apply_cursor({}, None) == {}
+    assert apply_cursor({}, cursor) == after
+    assert apply_cursor({"status": "new"}, cursor) == {"$and": [{"status": "new"}, after]}
+
+
+@pytest.mark.anyio
+async def test_cursor_pages_through_ties(db):
+    created_at = datetime(2024, 5, 17)
+    await db.leads.insert_many([{"id": f"lead-{i}", "created_at": created_at} for i in range(5)])
+    seen = []
+    cursor = None
+    while True:
+        page = await db.leads.find(apply_cursor({}, cursor)).sort([("created_at", -1), ("id", -1)]).to_list(2)
+        if not page:
+            break
+        seen += [doc["id"] for doc in page]
+        cursor = encode_cursor(page[-1]["created_at"], page[-1]["id"])
+    assert seen == [f"lead-{i}" for i in reversed(range(5))]
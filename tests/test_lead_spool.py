@@ -0,0 +1,187 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+
+from lead_spool import CircuitBreaker, LeadSpool
+from mongo_pool import PoolStats
+
+
+class FlakyCollection:
+    """Delegates to ``collection`` but fails ``insert_many`` while ``down`` is set."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.down = True
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def insert_many(self, docs, **kwargs):
+        if self.down:
+            raise ServerSelectionTimeoutError("no servers")
+        return await self.collection.insert_many(docs, **kwargs)
+
+
+def lead(lead_id):
+    return {"id": lead_id, "name": "Иван", "phone": "+79186333221"}
+
+
+async def stored_ids(collection):
+    return sorted([doc["id"] async for doc in collection.find({}, {"id": 1})])
+
+
+def test_breaker_opens_after_threshold_and_probes_once_per_timeout(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("lead_spool.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    now[0] += 30.0
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one probe per reset_timeout
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    now[0] += 30.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+@pytest.mark.anyio
+async def test_breaker_call_records_outcome():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    with pytest.raises(asyncio.TimeoutError):
+        await breaker.call(asyncio.sleep(1), timeout=0.01)
+    assert breaker.state == "open"
+
+    async def duplicate():
+        raise DuplicateKeyError("E11000")
+
+    # Mongo answered, so the breaker closes even though the write failed
+    with pytest.raises(DuplicateKeyError):
+        await breaker.call(duplicate(), timeout=1)
+    assert breaker.state == "closed"
+    assert await breaker.call(asyncio.sleep(0, "ok"), timeout=1) == "ok"
+
+
+@pytest.mark.anyio
+async def test_replay_stores_spooled_leads_once(db, tmp_path):
+    inserted = []
+
+    async def after_insert(docs):
+        inserted.extend(doc["id"] for doc in docs)
+
+    await db.contact_requests.create_index("id", unique=True)
+    collection = FlakyCollection(db.contact_requests)
+    breaker = CircuitBreaker()
+    spool = LeadSpool(str(tmp_path / "leads.jsonl"), collection, breaker, batch_size=2, after_insert=after_insert)
+    await spool.append(lead("a"))
+    await spool.append_many([lead("b"), lead("c")])
+    assert os.path.basename(spool.journal_path) == f"leads.{os.getpid()}.jsonl"
+
+    with pytest.raises(ServerSelectionTimeoutError):
+        await spool.replay()
+    assert spool.pending()
+    # The interrupted replay is picked up again; "b" reached Mongo in the meantime
+    await db.contact_requests.insert_one(lead("b"))
+    collection.down = False
+    await spool.append(lead("d"))
+    assert await spool.replay() == 3
+    assert not spool.pending()
+    assert await stored_ids(db.contact_requests) == ["a", "b", "c", "d"]
+    assert sorted(inserted) == ["a", "c", "d"]
+    await spool.close()
+
+
+@pytest.mark.anyio
+async def test_torn_lines_are_skipped(db, tmp_path):
+    path = tmp_path / "leads.jsonl"
+    spool = LeadSpool(str(path), db.contact_requests, CircuitBreaker())
+    # A journal left by a crashed worker, torn mid-line
+    orphan = tmp_path / "leads.1.jsonl"
+    orphan.write_text('{"id": "a"}\n{"id": "b", "na')
+    with open(spool.journal_path, "w") as journal:
+        journal.write('{"id": "c", "na')
+    await spool.append(lead("d"))
+    assert await spool.replay() == 2
+    assert await stored_ids(db.contact_requests) == ["a", "d"]
+    assert spool.journals() == []
+    await spool.close()
+
+
+@pytest.mark.anyio
+async def test_journal_held_by_another_process_is_left_alone(db, tmp_path):
+    path = str(tmp_path / "leads.jsonl")
+    writer = LeadSpool(path, db.contact_requests, CircuitBreaker())
+    await writer.append(lead("a"))
+    # Another worker sharing the spool directory
+    replayer = LeadSpool(path, db.contact_requests, CircuitBreaker())
+    replayer.journal_path = path.replace(".jsonl", ".other.jsonl")
+    assert await replayer.replay() == 0
+    await writer.close()
+    assert await replayer.replay() == 1
+    assert await stored_ids(db.contact_requests) == ["a"]
+
+
+@pytest.mark.anyio
+async def test_background_replay_waits_until_ready(db, tmp_path):
+    ready = asyncio.Event()
+    spool = LeadSpool(str(tmp_path / "leads.jsonl"), db.contact_requests, CircuitBreaker(), interval=0.01, ready=ready)
+    await spool.append(lead("a"))
+    spool.start()
+    await asyncio.sleep(0.05)
+    assert await stored_ids(db.contact_requests) == []
+    ready.set()
+    for _ in range(100):
+        if not spool.pending():
+            break
+        await asyncio.sleep(0.01)
+    await spool.close()
+    assert await stored_ids(db.contact_requests) == ["a"]
+
+
+class DownClient:
+    """Mongo client whose every command fails as if the server were unreachable."""
+
+    class admin:
+        @staticmethod
+        async def command(name):
+            raise ServerSelectionTimeoutError("no servers")
+
+
+@pytest.mark.anyio
+async def test_readiness_is_degraded_while_leads_can_be_spooled(db, tmp_path):
+    import server
+
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+    pool_stats = PoolStats()
+    pool_stats.warmed = True
+    context = SimpleNamespace(
+        client=DownClient(),
+        pool_stats=pool_stats,
+        settings=SimpleNamespace(mongo_options={"maxPoolSize": 10, "minPoolSize": 1}),
+        mongo_breaker=CircuitBreaker(),
+        lead_spool=LeadSpool(str(spool_dir / "leads.jsonl"), db.contact_requests, CircuitBreaker()),
+    )
+    app = FastAPI()
+    app.include_router(server.api_router)
+    app.dependency_overrides[server.get_context] = lambda: context
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/ready")
+        assert response.status_code == 200
+        assert response.json()["degraded"] is True
+        # Nowhere to put the leads either: not ready
+        spool_dir.rmdir()
+        response = await client.get("/api/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
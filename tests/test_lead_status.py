@@ -0,0 +1,78 @@
+import pytest
+
+from lead_stats import read_stats
+from lead_status import apply_status_changes
+
+
+async def insert_leads(db):
+    await db.contact_requests.insert_many([
+        {"id": "new-1", "status": "new", "version": 0},
+        {"id": "new-2", "status": "new", "version": 0},
+        # Stored before versioning: no status or version field
+        {"id": "legacy"},
+        {"id": "done", "status": "done", "version": 2},
+    ])
+
+
+class RacingCollection:
+    """Runs ``before_write`` between apply_status_changes' read and its bulk write."""
+
+    def __init__(self, collection, before_write):
+        self.collection = collection
+        self.before_write = before_write
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def bulk_write(self, requests, **kwargs):
+        await self.before_write()
+        return await self.collection.bulk_write(requests, **kwargs)
+
+
+@pytest.mark.anyio
+async def test_apply_status_changes_reports_conflicts(db):
+    await insert_leads(db)
+    result = await apply_status_changes(
+        db.contact_requests,
+        db.lead_stats,
+        [
+            ("new-1", "in_progress", None),
+            ("legacy", "rejected", 0),
+            ("new-2", "in_progress", 3),
+            ("done", "new", None),
+            ("missing", "done", None),
+            ("new-1", "rejected", None),
+        ],
+    )
+    assert result["updated"] == [
+        {"id": "new-1", "status": "in_progress", "version": 1},
+        {"id": "legacy", "status": "rejected", "version": 1},
+    ]
+    assert result["conflicts"] == [
+        {"id": "new-2", "status": "new", "version": 0, "reason": "version"},
+        {"id": "done", "status": "done", "version": 2, "reason": "transition"},
+        {"id": "missing", "status": None, "version": None, "reason": "not_found"},
+        {"id": "new-1", "status": "new", "version": 0, "reason": "duplicate"},
+    ]
+    lead = await db.contact_requests.find_one({"id": "new-1"})
+    assert (lead["status"], lead["version"]) == ("in_progress", 1)
+    stats = await read_stats(db.lead_stats)
+    assert stats["by_status"] == {"new": -2, "in_progress": 1, "rejected": 1}
+
+
+@pytest.mark.anyio
+async def test_apply_status_changes_loses_race_to_concurrent_change(db):
+    await insert_leads(db)
+
+    async def concurrent_change():
+        await db.contact_requests.update_one({"id": "new-1"}, {"$set": {"status": "rejected", "version": 1}})
+
+    result = await apply_status_changes(
+        RacingCollection(db.contact_requests, concurrent_change),
+        db.lead_stats,
+        [("new-1", "in_progress", 0), ("new-2", "in_progress", 0)],
+    )
+    assert result["updated"] == [{"id": "new-2", "status": "in_progress", "version": 1}]
+    assert result["conflicts"] == [{"id": "new-1", "status": "rejected", "version": 1, "reason": "version"}]
+    lead = await db.contact_requests.find_one({"id": "new-1"})
+    assert (lead["status"], lead["version"]) == ("rejected", 1)
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from lead_writer import LeadBatchWriter, QueueFull
+from mongo_errors import DUPLICATE_KEY_ERROR
+
+
+class RecordingCollection:
+    """Records ``insert_many`` batches; ``failures`` scripts per-call write errors by document id."""
+
+    def __init__(self, failures=()):
+        self.batches = []
+        self.stored = []
+        self.failures = list(failures)
+
+    async def insert_many(self, docs, ordered=True):
+        self.batches.append([doc["id"] for doc in docs])
+        codes = self.failures.pop(0) if self.failures else {}
+        errors = [
+            {"index": i, "code": codes[doc["id"]], "errmsg": "write failed"}
+            for i, doc in enumerate(docs)
+            if doc["id"] in codes
+        ]
+        self.stored += [doc["id"] for doc in docs if doc["id"] not in codes]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+
+def lead(lead_id):
+    return {"id": lead_id}
+
+
+@pytest.mark.anyio
+async def test_flush_by_batch_size():
+    collection = RecordingCollection()
+    writer = LeadBatchWriter(collection, batch_size=3, window=10.0)
+    writer.start()
+    for i in range(7):
+        await writer.submit(lead(str(i)))
+    await asyncio.sleep(0.01)
+    # Full batches go out immediately; the window only delays the partial one
+    assert collection.batches == [["0", "1", "2"], ["3", "4", "5"]]
+    await writer.close()
+    assert collection.batches[-1] == ["6"]
+
+
+@pytest.mark.anyio
+async def test_flush_by_time_window():
+    collection = RecordingCollection()
+    writer = LeadBatchWriter(collection, batch_size=100, window=0.05)
+    writer.start()
+    await writer.submit(lead("a"))
+    await writer.submit(lead("b"))
+    await asyncio.sleep(0.01)
+    assert collection.batches == []
+    await asyncio.sleep(0.1)
+    assert collection.batches == [["a", "b"]]
+    await writer.close()
+
+
+@pytest.mark.anyio
+async def test_submit_raises_queue_full_after_put_timeout():
+    writer = LeadBatchWriter(RecordingCollection(), maxsize=1, put_timeout=0.05)
+    # Not started: nothing drains the queue
+    await writer.submit(lead("a"))
+    started = asyncio.get_running_loop().time()
+    with pytest.raises(QueueFull):
+        await writer.submit(lead("b"))
+    assert asyncio.get_running_loop().time() - started >= 0.05
+
+
+@pytest.mark.anyio
+async def test_close_drains_the_queue_and_refuses_new_documents():
+    collection = RecordingCollection()
+    writer = LeadBatchWriter(collection, batch_size=2, window=10.0)
+    writer.start()
+    for i in range(5):
+        await writer.submit(lead(str(i)))
+    await writer.close()
+    assert collection.stored == ["0", "1", "2", "3", "4"]
+    with pytest.raises(QueueFull):
+        await writer.submit(lead("late"))
+
+
+@pytest.mark.anyio
+async def test_partial_failure_retries_only_failed_documents():
+    collection = RecordingCollection(failures=[{"b": 1, "c": DUPLICATE_KEY_ERROR}, {}])
+    writer = LeadBatchWriter(collection, batch_size=3, window=10.0, max_attempts=3)
+    writer.start()
+    for lead_id in "abc":
+        await writer.submit(lead(lead_id))
+    await writer.close()
+    # The duplicate is already stored and is not retried
+    assert collection.batches == [["a", "b", "c"], ["b"]]
+    assert collection.stored == ["a", "b"]
+
+
+@pytest.mark.anyio
+async def test_duplicates_are_reported():
+    reported = []
+
+    async def on_duplicates(docs):
+        reported.extend(doc["id"] for doc in docs)
+
+    collection = RecordingCollection(failures=[{"b": DUPLICATE_KEY_ERROR, "c": 1}])
+    writer = LeadBatchWriter(collection, batch_size=3, window=10.0, on_duplicates=on_duplicates)
+    writer.start()
+    for lead_id in "abc":
+        await writer.submit(lead(lead_id))
+    await writer.close()
+    assert reported == ["b"]
+    assert collection.stored == ["a", "c"]
+
+
+@pytest.mark.anyio
+async def test_documents_failing_every_attempt_go_to_on_dropped():
+    dropped = []
+
+    async def on_dropped(docs):
+        dropped.extend(doc["id"] for doc in docs)
+
+    # "b" fails twice and then succeeds, "c" fails all three attempts, "d" is a duplicate
+    collection = RecordingCollection(failures=[{"b": 1, "c": 1, "d": DUPLICATE_KEY_ERROR}, {"b": 1, "c": 1}, {"c": 1}])
+    writer = LeadBatchWriter(collection, batch_size=4, window=10.0, max_attempts=3, on_dropped=on_dropped)
+    writer.start()
+    for lead_id in "abcd":
+        await writer.submit(lead(lead_id))
+    await writer.close()
+    assert collection.batches == [["a", "b", "c", "d"], ["b", "c"], ["b", "c"]]
+    assert dropped == ["c"]
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from notifications import OutboxWorkerPool, pending_notification
+
+
+class FlakySink:
+    """Fails every entry for the first ``failures`` batches, then delivers."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+
+    async def send_batch(self, entries):
+        self.batches.append([entry["id"] for entry in entries])
+        if len(self.batches) <= self.failures:
+            return {entry["id"]: "421 try again later" for entry in entries}
+        return {}
+
+
+async def insert_lead(db, lead_id, **notify):
+    lead = {"id": lead_id, "name": "Иван", "phone": "+79186333221", "created_at": datetime.utcnow()}
+    lead["notify"] = {**pending_notification(datetime.utcnow() - timedelta(seconds=1)), **notify}
+    await db.contact_requests.insert_one(lead)
+
+
+async def run_cycle(pool):
+    batch = await pool._claim()
+    if batch:
+        await pool._deliver(batch)
+    return batch
+
+
+async def notify_of(db, lead_id):
+    return (await db.contact_requests.find_one({"id": lead_id}))["notify"]
+
+
+@pytest.mark.anyio
+async def test_claim_marks_entries_processing_with_a_token(db):
+    await insert_lead(db, "a")
+    await insert_lead(db, "later", next_attempt_at=datetime.utcnow() + timedelta(hours=1))
+    pool = OutboxWorkerPool(db.contact_requests, FlakySink(), lease=60)
+    batch = await pool._claim()
+    assert [entry["id"] for entry in batch] == ["a"]
+    assert batch[0]["payload"]["name"] == "Иван"
+    notify = await notify_of(db, "a")
+    assert notify["status"] == "processing"
+    assert notify["claim"]
+    assert notify["lease_until"] > datetime.utcnow()
+    # Claimed entries are not handed to a second worker
+    assert await pool._claim() == []
+
+
+@pytest.mark.anyio
+async def test_delivered_entries_are_marked_sent(db):
+    await insert_lead(db, "a")
+    pool = OutboxWorkerPool(db.contact_requests, FlakySink())
+    await run_cycle(pool)
+    notify = await notify_of(db, "a")
+    assert notify["status"] == "sent"
+    assert "sent_at" in notify
+    assert "claim" not in notify and "lease_until" not in notify
+
+
+@pytest.mark.anyio
+async def test_failures_back_off_then_succeed(db):
+    await insert_lead(db, "a")
+    sink = FlakySink(failures=2)
+    pool = OutboxWorkerPool(db.contact_requests, sink, base_delay=10, max_delay=15)
+    for attempts, delay in ((1, 10), (2, 15)):
+        # Mongo stores datetimes with millisecond precision
+        before = datetime.utcnow() - timedelta(milliseconds=1)
+        await run_cycle(pool)
+        notify = await notify_of(db, "a")
+        assert notify["status"] == "pending"
+        assert notify["attempts"] == attempts
+        assert notify["last_error"] == "421 try again later"
+        assert "claim" not in notify
+        assert before + timedelta(seconds=delay) <= notify["next_attempt_at"] <= datetime.utcnow() + timedelta(seconds=delay)
+        # Not due yet: nothing to claim
+        assert await run_cycle(pool) == []
+        await db.contact_requests.update_one({"id": "a"}, {"$set": {"notify.next_attempt_at": datetime.utcnow()}})
+    await run_cycle(pool)
+    assert (await notify_of(db, "a"))["status"] == "sent"
+    assert sink.batches == [["a"], ["a"], ["a"]]
+
+
+@pytest.mark.anyio
+async def test_entry_fails_after_max_attempts(db):
+    await insert_lead(db, "a")
+    pool = OutboxWorkerPool(db.contact_requests, FlakySink(failures=10), base_delay=0, max_attempts=3)
+    for _ in range(3):
+        await run_cycle(pool)
+    notify = await notify_of(db, "a")
+    assert notify["status"] == "failed"
+    assert notify["attempts"] == 3
+    assert await run_cycle(pool) == []
+
+
+@pytest.mark.anyio
+async def test_expired_lease_is_taken_over(db):
+    now = datetime.utcnow()
+    await insert_lead(db, "stale", status="processing", claim="dead-worker", lease_until=now - timedelta(seconds=1))
+    await insert_lead(db, "live", status="processing", claim="busy-worker", lease_until=now + timedelta(minutes=1))
+    pool = OutboxWorkerPool(db.contact_requests, FlakySink())
+    batch = await run_cycle(pool)
+    assert [entry["id"] for entry in batch] == ["stale"]
+    assert (await notify_of(db, "stale"))["status"] == "sent"
+    live = await notify_of(db, "live")
+    assert live["status"] == "processing" and live["claim"] == "busy-worker"
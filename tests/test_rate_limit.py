@@ -0,0 +1,85 @@
+import pytest
+
+from rate_limit import RateLimit, RateLimitMiddleware, ShardedTokenBucketLimiter, parse_rate_limits
+
+
+def test_parse_rate_limits_longest_prefix_first():
+    limits = parse_rate_limits("/api=60/60, /api/contact-form=5/60,")
+    assert limits == [("/api/contact-form", RateLimit(5.0, 5 / 60)), ("/api", RateLimit(60.0, 1.0))]
+    limiter = ShardedTokenBucketLimiter(limits)
+    assert limiter.limit_for("/api/contact-form")[0] == "/api/contact-form"
+    assert limiter.limit_for("/api/services")[0] == "/api"
+    assert limiter.limit_for("/health") is None
+
+
+def test_token_bucket_burst_and_refill():
+    limiter = ShardedTokenBucketLimiter([])
+    limit = RateLimit(capacity=3, refill_per_second=1.0)
+    assert [limiter.check("1.2.3.4", "/api", limit, now=100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.check("1.2.3.4", "/api", limit, now=100.0) == pytest.approx(1.0)
+    # Other clients and prefixes have buckets of their own
+    assert limiter.check("5.6.7.8", "/api", limit, now=100.0) == 0.0
+    assert limiter.check("1.2.3.4", "/api/admin", limit, now=100.0) == 0.0
+    assert limiter.check("1.2.3.4", "/api", limit, now=100.5) == pytest.approx(0.5)
+    assert limiter.check("1.2.3.4", "/api", limit, now=101.0) == 0.0
+    # Refill never exceeds the capacity
+    assert [limiter.check("1.2.3.4", "/api", limit, now=1000.0) for _ in range(4)][-1] > 0
+
+
+def test_idle_buckets_are_swept():
+    limiter = ShardedTokenBucketLimiter([], shards=1, idle_ttl=10.0, sweep_interval=1.0)
+    limit = RateLimit(capacity=1, refill_per_second=1.0)
+    limiter.check("a", "/api", limit, now=limiter._last_sweep)
+    assert len(limiter) == 1
+    limiter.check("b", "/api", limit, now=limiter._last_sweep + 60.0)
+    assert len(limiter) == 1
+
+
+@pytest.mark.parametrize(
+    "trust_proxy, proxy_hops, headers, expected",
+    [
+        (False, 1, [(b"x-forwarded-for", b"1.1.1.1")], "10.0.0.1"),
+        (True, 1, [], "10.0.0.1"),
+        (True, 1, [(b"x-forwarded-for", b"6.6.6.6, 1.1.1.1")], "1.1.1.1"),
+        (True, 2, [(b"x-forwarded-for", b"6.6.6.6, 1.1.1.1, 10.0.0.2")], "1.1.1.1"),
+        (True, 1, [(b"x-forwarded-for", b"6.6.6.6"), (b"x-forwarded-for", b"1.1.1.1")], "1.1.1.1"),
+        (True, 3, [(b"x-forwarded-for", b"1.1.1.1")], "10.0.0.1"),
+    ],
+)
+def test_client_ip(trust_proxy, proxy_hops, headers, expected):
+    middleware = RateLimitMiddleware(None, ShardedTokenBucketLimiter([]), trust_proxy, proxy_hops)
+    assert middleware.client_ip({"headers": headers, "client": ("10.0.0.1", 5000)}) == expected
+
+
+@pytest.mark.anyio
+async def test_forwarded_clients_behind_one_proxy_get_separate_buckets():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    limiter = ShardedTokenBucketLimiter(parse_rate_limits("/api/contact-form=1/60"))
+    middleware = RateLimitMiddleware(app, limiter, trust_proxy=True, proxy_hops=1)
+
+    async def post(forwarded_for):
+        statuses = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/api/contact-form",
+            "headers": [(b"x-forwarded-for", forwarded_for.encode())],
+            # Every request arrives from the ingress
+            "client": ("10.0.0.1", 5000),
+        }
+        await middleware(scope, None, send)
+        return statuses[0]
+
+    assert await post("1.1.1.1") == 200
+    assert await post("2.2.2.2") == 200
+    assert await post("1.1.1.1") == 429
+    # A client cannot escape its bucket by prepending entries
+    assert await post("9.9.9.9, 2.2.2.2") == 429
@@ -0,0 +1,26 @@
+from ttl_cache import TTLCache
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("ttl_cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=5.0)
+    cache.put("a", 1)
+    now[0] += 5.0
+    assert cache.get("a") == 1
+    now[0] += 0.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60.0)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
@@ -0,0 +1,58 @@
+import pytest
+
+from validation import canonical_phone, parse_area_sqm
+
+
+# Inputs the original form validator accepted; they must keep passing
+LEGACY_PHONES = [
+    ("+7 (918) 633-32-21", "+79186333221"),
+    ("+79186333221", "+79186333221"),
+    ("89186333221", "+79186333221"),
+    ("9186333221", "+79186333221"),
+    ("8(861) 953-40-77", "+78619534077"),
+    ("+7\xa0918\xa0633\xa032\xa021", "+79186333221"),
+    ("8\t918 633 32 21", "+79186333221"),
+    ("+7 918 633 32 21\n", "+79186333221"),
+]
+
+
+@pytest.mark.parametrize("phone, expected", LEGACY_PHONES)
+def test_canonical_phone_accepts_legacy_formats(phone, expected):
+    assert canonical_phone(phone) == expected
+
+
+@pytest.mark.parametrize(
+    "phone",
+    [
+        "",
+        "12345",
+        "+1 918 633 32 21",
+        "+7 918 633 32 2",
+        "+7 918 633 32 211",
+        "+7٩١٨٦٣٣٣٢٢١",
+        "+7 918 633 32 21 доб. 5",
+    ],
+)
+def test_canonical_phone_rejects_invalid(phone):
+    assert canonical_phone(phone) is None
+
+
+@pytest.mark.parametrize(
+    "area, expected",
+    [
+        ("1500 м²", 1500.0),
+        ("1 500 м2", 1500.0),
+        ("30x60", 1800.0),
+        ("30 х 60 м", 1800.0),
+        ("от 500 до 800", 650.0),
+        ("500-800 м²", 650.0),
+        ("1,5 га", 15000.0),
+    ],
+)
+def test_parse_area_sqm(area, expected):
+    assert parse_area_sqm(area) == expected
+
+
+@pytest.mark.parametrize("area", [None, "", "без площади", "около 5 м", "2000000"])
+def test_parse_area_sqm_rejects_implausible(area):
+    assert parse_area_sqm(area) is None